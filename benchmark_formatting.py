@@ -0,0 +1,252 @@
+import argparse
+import time
+
+from entities import BusinessUnitOrgs, EntityGraph, InventoryOrg, ItemSupplier
+from services import DEFAULT_MAX_SUPPLIERS, DEFAULT_MAX_SITES, format_grouped_item_summary
+
+
+def legacy_format_grouped_item_summary(item_number: str, item_list: list, item_suppliers_map: dict, max_suppliers: int = DEFAULT_MAX_SUPPLIERS, max_sites: int = DEFAULT_MAX_SITES) -> dict:
+    """The nested-scan formatter replaced by the indexed one, kept as the baseline."""
+    if not item_list:
+        return {"item_name": item_number, "error": "No data available"}
+    first_item = item_list[0]
+    product_data = {
+        "item_name": item_number,
+        "item_id": first_item.get('ItemId'),
+        "description": first_item.get('ItemDescription'),
+        "primary_uom": first_item.get('PrimaryUOMValue'),
+        "item_class": first_item.get('ItemClass'),
+        "status": first_item.get('ItemStatusValue'),
+        "purchasable": first_item.get('PurchasableFlag'),
+        "organizations": []
+    }
+    
+    # Process each organization - only show inventory organizations (InventoryFlag: True)
+    for item in item_list:
+        org_id = item.get('OrganizationId')
+        org_code = item.get('OrganizationCode')
+        list_price = item.get('ListPrice')
+        
+        item_key = f"{item_number}_{org_id}"
+        suppliers = item_suppliers_map.get(item_key, [])
+        
+        # Check if organization has inventory flag
+        has_inventory_flag = False
+        org_name = None
+        for supplier in suppliers:
+            sites = supplier.get('sites', [])
+            for site in sites:
+                inventory_orgs = site.get('inventory_organizations', [])
+                for inv_org in inventory_orgs:
+                    if str(inv_org.get('OrganizationId')) == str(org_id):
+                        if inv_org.get('InventoryFlag'):
+                            has_inventory_flag = True
+                        org_name = inv_org.get('OrganizationName')
+                        break
+                if org_name:
+                    break
+            if org_name:
+                break
+        
+        if not has_inventory_flag:
+            continue
+        
+        # Get procurement BU info
+        procurement_bu_id = None
+        procurement_bu_name = None
+        for supplier in suppliers:
+            sites = supplier.get('sites', [])
+            for site in sites:
+                if site.get('ProcurementBUId'):
+                    procurement_bu_id = site.get('ProcurementBUId')
+                    procurement_bu_name = site.get('ProcurementBU')
+                    break
+            if procurement_bu_id:
+                break
+        
+        # Process suppliers
+        supplier_list = []
+        for supplier in suppliers[:max_suppliers]:
+            supplier_data = {
+                "supplier_name": supplier.get('SupplierName'),
+                "supplier_party_id": supplier.get('SupplierPartyId'),
+                "sites": []
+            }
+            
+            sites = supplier.get('sites', [])
+            for site in sites[:max_sites]:
+                site_data = {
+                    "site_name": site.get('SupplierSite'),
+                    "business_unit": site.get('ProcurementBU'),
+                    "site_purpose": []
+                }
+                
+                if site.get('SitePurposePurchasingFlag'):
+                    site_data["site_purpose"].append('Purchasing')
+                if site.get('SitePurposePayFlag'):
+                    site_data["site_purpose"].append('Payment')
+                
+                # Get delivery locations
+                delivery_locations = []
+                inventory_orgs = site.get('inventory_organizations', [])
+                inventory_locations = site.get('inventory_locations', {})
+                
+                for inv_org in inventory_orgs:
+                    if inv_org.get('InventoryFlag') and str(inv_org.get('OrganizationId')) == str(org_id):
+                        org_id_inv = inv_org.get('OrganizationId')
+                        if inventory_locations and org_id_inv in inventory_locations:
+                            org_details = inventory_locations[org_id_inv]
+                            location_id = org_details.get('LocationId')
+                            if location_id:
+                                delivery_locations.append({
+                                    "organization_name": inv_org.get('OrganizationName'),
+                                    "deliver_to_location_id": location_id
+                                })
+                
+                # If no delivery locations for specific org, get all inventory orgs
+                if not delivery_locations:
+                    for inv_org in inventory_orgs:
+                        if inv_org.get('InventoryFlag'):
+                            org_id_inv = inv_org.get('OrganizationId')
+                            if inventory_locations and org_id_inv in inventory_locations:
+                                org_details = inventory_locations[org_id_inv]
+                                location_id = org_details.get('LocationId')
+                                if location_id:
+                                    delivery_locations.append({
+                                        "organization_name": inv_org.get('OrganizationName'),
+                                        "deliver_to_location_id": location_id
+                                    })
+                
+                site_data["delivery_locations"] = delivery_locations[:3]  # Limit to 3
+                supplier_data["sites"].append(site_data)
+            
+            supplier_list.append(supplier_data)
+        
+        org_data = {
+            "organization_code": org_code,
+            "organization_name": org_name,
+            "procurement_bu_id": procurement_bu_id,
+            "procurement_bu_name": procurement_bu_name,
+            "destination_organization_id": org_id,
+            "list_price": list_price,
+            "suppliers": supplier_list
+        }
+        
+        product_data["organizations"].append(org_data)
+    
+    if not product_data["organizations"]:
+        return None
+    
+    return product_data
+
+
+def build_inputs(orgs: int, suppliers: int, sites: int, business_units: int):
+    """Build one item stocked in many organizations, with suppliers whose sites span several business units.
+
+    The inputs use the per-site dictionaries the nested-scan formatter reads: sites
+    of the same business unit share one organization list and location map.
+    """
+    org_ids = list(range(300000000001, 300000000001 + orgs))
+    bu_data = []
+    for bu in range(business_units):
+        inventory_orgs = [
+            {
+                "OrganizationId": org_id,
+                "OrganizationName": f"Org {org_id}",
+                "OrganizationCode": f"O{index}",
+                "InventoryFlag": index % 4 != 0,
+            }
+            for index, org_id in enumerate(org_ids)
+        ]
+        # Half the organizations have no location, so their sites fall back to the whole list
+        inventory_locations = {org_id: {"LocationId": 900 + index} for index, org_id in enumerate(org_ids) if index % 2}
+        bu_data.append((inventory_orgs, inventory_locations))
+
+    supplier_list = []
+    for supplier in range(suppliers):
+        site_list = []
+        for site in range(sites):
+            bu = (supplier + site) % business_units
+            inventory_orgs, inventory_locations = bu_data[bu]
+            site_list.append({
+                "SupplierSite": f"SITE-{supplier}-{site}",
+                "ProcurementBUId": 1000 + bu,
+                "ProcurementBU": f"BU {bu}",
+                "SitePurposePurchasingFlag": True,
+                "SitePurposePayFlag": site % 2 == 0,
+                "inventory_organizations": inventory_orgs,
+                "inventory_locations": inventory_locations,
+            })
+        supplier_list.append({"SupplierName": f"Supplier {supplier}", "SupplierPartyId": 5000 + supplier, "sites": site_list})
+
+    # Items carry IDs as strings while organization rows carry numbers, as mixed payloads do
+    item_list = [
+        {"ItemId": 1, "ItemNumber": "BRAKE-PAD", "OrganizationId": str(org_id), "OrganizationCode": f"O{index}", "ListPrice": 10.0}
+        for index, org_id in enumerate(org_ids)
+    ]
+    item_suppliers_map = {f"BRAKE-PAD_{item['OrganizationId']}": supplier_list for item in item_list}
+    return item_list, item_suppliers_map
+
+
+def build_graph(item_list: list, item_suppliers_map: dict):
+    """Convert the nested-scan inputs into the item entities and entity graph the current formatter reads."""
+    graph = EntityGraph()
+    items = []
+    for item in item_list:
+        entity = graph.add_item(item)
+        items.append(entity)
+        item_suppliers = []
+        for supplier in item_suppliers_map[f"{item['ItemNumber']}_{item['OrganizationId']}"]:
+            sites = graph.add_supplier_sites(supplier["SupplierPartyId"], supplier["sites"])
+            for site, row in zip(sites, supplier["sites"]):
+                if graph.business_unit(site.procurement_bu_id) is None:
+                    locations = row["inventory_locations"]
+                    graph.add_business_unit(site.procurement_bu_id, BusinessUnitOrgs(tuple(
+                        InventoryOrg.from_fusion(org, locations.get(org["OrganizationId"], {}).get("LocationId"))
+                        for org in row["inventory_organizations"]
+                    )))
+            item_suppliers.append(ItemSupplier(
+                graph.add_supplier(supplier["SupplierPartyId"], supplier["SupplierPartyId"], supplier["SupplierName"]), sites
+            ))
+        graph.set_item_suppliers(entity, item_suppliers)
+    return items, graph
+
+
+def time_formatter(formatter, item_list: list, suppliers, runs: int, max_suppliers: int, max_sites: int) -> float:
+    """Return the best wall time of several formatter runs, in milliseconds."""
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        formatter("BRAKE-PAD", item_list, suppliers, max_suppliers, max_sites)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the indexed product formatter with the nested-scan one on synthetic inputs")
+    parser.add_argument("--orgs", type=int, default=300, help="Inventory organizations per business unit, and organizations the item is stocked in")
+    parser.add_argument("--suppliers", type=int, default=5, help="Suppliers per item")
+    parser.add_argument("--sites", type=int, default=5, help="Sites per supplier")
+    parser.add_argument("--business-units", type=int, default=3, help="Distinct business units across the sites")
+    parser.add_argument("--max-suppliers", type=int, default=DEFAULT_MAX_SUPPLIERS, help="Suppliers shown per organization")
+    parser.add_argument("--max-sites", type=int, default=DEFAULT_MAX_SITES, help="Sites shown per supplier")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per formatter; the best is reported")
+    args = parser.parse_args()
+
+    item_list, item_suppliers_map = build_inputs(args.orgs, args.suppliers, args.sites, args.business_units)
+    items, graph = build_graph(item_list, item_suppliers_map)
+    expected = legacy_format_grouped_item_summary("BRAKE-PAD", item_list, item_suppliers_map, args.max_suppliers, args.max_sites)
+    actual = format_grouped_item_summary("BRAKE-PAD", items, graph, args.max_suppliers, args.max_sites)
+    if actual != expected:
+        raise SystemExit("❌ Indexed formatter output differs from the nested-scan formatter")
+
+    legacy_ms = time_formatter(legacy_format_grouped_item_summary, item_list, item_suppliers_map, args.runs, args.max_suppliers, args.max_sites)
+    indexed_ms = time_formatter(format_grouped_item_summary, items, graph, args.runs, args.max_suppliers, args.max_sites)
+
+    print("=" * 50)
+    print(f"{args.orgs} orgs x {args.suppliers} suppliers x {args.sites} sites, {args.business_units} business units")
+    print(f"showing {args.max_suppliers} suppliers x {args.max_sites} sites, {len(actual['organizations'])} organizations in the output")
+    print("=" * 50)
+    print(f"Nested scan: {legacy_ms:.2f} ms")
+    print(f"Indexed:     {indexed_ms:.2f} ms  ({legacy_ms / indexed_ms:.1f}x faster)")
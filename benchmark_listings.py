@@ -0,0 +1,81 @@
+import argparse
+import asyncio
+import resource
+import statistics
+import sys
+import tracemalloc
+
+from cache import invalidate_cache, cache_stats
+from fusion_http import close_clients
+from services import stream_matching_listings, DEFAULT_MAX_SUPPLIERS, DEFAULT_MAX_SITES
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Return the value at the given fraction of a sorted list (nearest rank)."""
+    ordered = sorted(values)
+    return ordered[max(0, int(round(len(ordered) * fraction)) - 1)]
+
+
+def peak_rss_mb() -> float:
+    """Return the process's peak resident set size so far, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def run_benchmark(terms: list, limit: int, runs: int, cold: bool, max_suppliers: int, max_sites: int, trace_memory: bool):
+    """Run the listings search repeatedly and report time-to-first-result, total latency and memory."""
+    first_result_times = []
+    total_times = []
+    heap_peaks = []
+    rss_before = peak_rss_mb()
+
+    for run in range(runs):
+        if cold:
+            for name in cache_stats():
+                invalidate_cache(name)
+
+        if trace_memory:
+            tracemalloc.start()
+        products = 0
+        async for event in stream_matching_listings(terms, limit, max_suppliers, max_sites):
+            if event["type"] == "product":
+                products += 1
+            else:
+                summary = event
+        if trace_memory:
+            heap_peaks.append(tracemalloc.get_traced_memory()[1] / (1024 * 1024))
+            tracemalloc.stop()
+
+        if summary.get("time_to_first_result_ms") is not None:
+            first_result_times.append(summary["time_to_first_result_ms"])
+        total_times.append(summary["total_ms"])
+        print(f"Run {run + 1}: {products} products, first result {summary.get('time_to_first_result_ms')} ms, total {summary['total_ms']} ms, {summary['total_queries']} search queries, peak RSS {peak_rss_mb():.1f} MB")
+
+    await close_clients()
+
+    print("\n" + "=" * 50)
+    print(f"Terms: {terms}  limit={limit}  maxSuppliers={max_suppliers}  maxSites={max_sites}  runs={runs}  {'cold' if cold else 'warm'} caches")
+    print("=" * 50)
+    for label, values in (("Time to first result", first_result_times), ("Total latency", total_times)):
+        if not values:
+            print(f"{label}: no products returned")
+            continue
+        print(f"{label} (ms): p50={statistics.median(values):.1f}  p95={percentile(values, 0.95):.1f}  max={max(values):.1f}")
+    print(f"Peak RSS: {peak_rss_mb():.1f} MB ({peak_rss_mb() - rss_before:+.1f} MB during the searches)")
+    if heap_peaks:
+        print(f"Peak Python heap per search (MB): p50={statistics.median(heap_peaks):.2f}  max={max(heap_peaks):.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark find_matching_listings against the configured Fusion instance")
+    parser.add_argument("terms", nargs="*", default=["brake pad", "brake-pad", "brake"], help="Search terms")
+    parser.add_argument("--limit", type=int, default=10, help="Result limit per search")
+    parser.add_argument("--runs", type=int, default=5, help="Number of searches to run")
+    parser.add_argument("--cold", action="store_true", help="Clear the reference data caches before every run")
+    parser.add_argument("--max-suppliers", type=int, default=DEFAULT_MAX_SUPPLIERS, help="Suppliers per item organization")
+    parser.add_argument("--max-sites", type=int, default=DEFAULT_MAX_SITES, help="Sites per supplier")
+    parser.add_argument("--trace-memory", action="store_true", help="Also measure the peak Python heap of each search (slower)")
+    args = parser.parse_args()
+
+    asyncio.run(run_benchmark(args.terms, args.limit, args.runs, args.cold, args.max_suppliers, args.max_sites, args.trace_memory))
@@ -0,0 +1,320 @@
+import asyncio
+import contextvars
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+from cache_backend import (
+    get_cache_backend, register_cache, backend_read, backend_write, JsonCodec,
+    CACHE_BACKEND_RETENTION, CACHE_BACKEND_COMPACT_INTERVAL, CACHE_INVALIDATION_POLL_INTERVAL
+)
+
+# Fraction of the TTL after which a hit also triggers a background refresh
+CACHE_REFRESH_AHEAD = float(os.getenv("CACHE_REFRESH_AHEAD", "0.8"))
+
+_caches: dict[str, "TTLCache"] = {}
+
+class TTLCache:
+    """Bounded LRU cache with per-entry expiry and background refresh.
+
+    Entries older than ``ttl * refresh_ahead`` are still served, but a refresh is
+    started in the background so hot keys never expire on the request path.
+    With ``stale_ttl`` set, expired entries keep being served for that long while
+    they are revalidated (stale-while-revalidate). Expired entries are kept until
+    evicted so they can stand in when a reload fails. Empty values (negative entries
+    such as an unknown ID) expire after ``negative_ttl`` when it is set.
+    Concurrent misses for the same key share a single loader call.
+
+    With a ``persist`` codec, entries are also written to the shared cache backend
+    and read back from it when the in-memory copy is missing or expired, so they
+    survive restarts and are shared with the other workers on the host; the
+    in-memory entries act as each worker's hot L1. Invalidations are broadcast to
+    the other workers through the backend. Backend reads are awaited on a worker
+    thread and writes are queued, so the event loop never waits on the backend.
+    """
+
+    def __init__(self, name: str, ttl: float, max_size: int = 1024, refresh_ahead: float = CACHE_REFRESH_AHEAD, stale_ttl: float = 0, negative_ttl: float = None, persist: JsonCodec = None):
+        self.name = name
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.refresh_ahead = refresh_ahead
+        self.stale_ttl = stale_ttl
+        self.persist = persist
+        self._entries: OrderedDict[Hashable, tuple[Any, float, float]] = OrderedDict()
+        self._loading: dict[Hashable, asyncio.Future] = {}
+        self._refreshing: set[Hashable] = set()
+        self._tasks: set[asyncio.Task] = set()
+        # Bumped on every invalidation, so a backend read that overlapped one is not stored
+        self._generation = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.fallback_hits = 0
+        self.backend_hits = 0
+        self.remote_invalidations = 0
+        _caches[name] = self
+        if persist is not None:
+            register_cache(name, max_size)
+
+    def _backend(self):
+        """Return the shared backend if this cache stores its entries there."""
+        return get_cache_backend() if self.persist is not None else None
+
+    async def _lookup(self, key: Hashable) -> tuple[Any, float, float] | None:
+        """Return the in-memory entry for key, or the backend's when it is missing or expired and the backend holds a newer one."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[2] > time.monotonic():
+            return entry
+        backend = self._backend()
+        if backend is None:
+            return entry
+        generation = self._generation
+        row = await backend_read(backend.get, self.name, str(key))
+        # The entry may have been replaced or invalidated while the backend was read
+        entry = self._entries.get(key)
+        if row is None or generation != self._generation:
+            return entry
+
+        encoded, stored_at, expires_at = row
+        # Wall clock timestamps from the backend, converted to this process's monotonic clock
+        backend_stored_at = time.monotonic() - (time.time() - stored_at)
+        backend_expires_at = backend_stored_at + (expires_at - stored_at)
+        if entry is not None and entry[2] >= backend_expires_at:
+            return entry
+        try:
+            value = self.persist.decode(encoded)
+        except (ValueError, TypeError, KeyError) as e:
+            print(f"⚠️ Ignoring undecodable backend entry for cache '{self.name}' key {key}: {e}")
+            return entry
+
+        self.backend_hits += 1
+        entry = (value, backend_stored_at, backend_expires_at)
+        self._store(key, entry)
+        return entry
+
+    def _store(self, key: Hashable, entry: tuple[Any, float, float]):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value if present and not expired, otherwise None. Counts as a hit or miss.
+
+        Only the in-memory entries are consulted; get_or_load also reads the backend.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[2] <= time.monotonic():
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: float = None):
+        """Store a value, evicting the least recently used entry once max_size is reached."""
+        if ttl is None:
+            ttl = self.negative_ttl if not value and self.negative_ttl is not None else self.ttl
+        now = time.monotonic()
+        self._store(key, (value, now, now + ttl))
+
+        backend = self._backend()
+        if backend is not None:
+            try:
+                encoded = self.persist.encode(value)
+            except (TypeError, ValueError) as e:
+                print(f"⚠️ Not persisting cache '{self.name}' key {key}: {e}")
+                return
+            backend_write(backend.set, self.name, str(key), encoded, ttl, self.stale_ttl + CACHE_BACKEND_RETENTION)
+
+    def invalidate(self, key: Hashable = None):
+        """Drop one key, or every entry when no key is given, here, in the backend and in the other workers."""
+        self._drop(key)
+        backend = get_cache_backend()
+        if backend is not None:
+            backend_write(backend.invalidate, self.name, None if key is None else str(key))
+
+    def _drop(self, key: Hashable = None):
+        self._generation += 1
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def apply_remote_invalidation(self, key: str | None):
+        """Drop the in-memory copy of an entry another worker invalidated.
+
+        Keys arrive as strings; keys of other types are matched by their string form.
+        """
+        self.remote_invalidations += 1
+        if key is None or key in self._entries:
+            self._drop(key)
+            return
+        for local_key in [local_key for local_key in self._entries if str(local_key) == key]:
+            self._drop(local_key)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches predicate. Returns the number of entries dropped."""
+        keys = [key for key in self._entries if predicate(key)]
+        for key in keys:
+            self._drop(key)
+        backend = get_cache_backend()
+        if backend is not None:
+            if self.persist is not None:
+                for key in keys:
+                    backend_write(backend.invalidate, self.name, str(key))
+            else:
+                # The other workers cannot evaluate the predicate, so they drop the whole cache
+                backend_write(backend.invalidate, self.name, None)
+        return len(keys)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for key, calling loader on a miss.
+
+        The loader returns None to signal a failed lookup. Nothing is cached then,
+        and the last known value for the key is returned even if it has expired
+        (for example while the upstream circuit breaker is open), or None if there
+        is none. Any other value, including an empty one, is cached.
+        """
+        entry = await self._lookup(key)
+        now = time.monotonic()
+
+        if entry is not None:
+            value, stored_at, expires_at = entry
+            if expires_at > now:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                if now - stored_at >= (expires_at - stored_at) * self.refresh_ahead:
+                    self._schedule_refresh(key, loader)
+                return value
+            if expires_at + self.stale_ttl > now:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                self._schedule_refresh(key, loader)
+                return value
+
+        self.misses += 1
+        return await self._load(key, loader)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Run the loader once per key, sharing the result with concurrent callers."""
+        pending = self._loading.get(key)
+        while pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # Only retry when the leading load was cancelled, not this caller
+                if not pending.cancelled():
+                    raise
+            pending = self._loading.get(key)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            value = await loader()
+            if value is not None:
+                self.set(key, value)
+            else:
+                value = self._fallback(key)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unobserved failure does not log a warning
+            future.exception()
+            raise
+        finally:
+            self._loading.pop(key, None)
+
+    def _fallback(self, key: Hashable) -> Any:
+        """Return an expired value for key, if one is still held, after a failed load."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self.fallback_hits += 1
+        return entry[0]
+
+    def _schedule_refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]]):
+        """Reload a key in the background unless a refresh is already running."""
+        if key in self._refreshing or key in self._loading:
+            return
+        self._refreshing.add(key)
+        self.refreshes += 1
+
+        async def refresh():
+            try:
+                await self._load(key, loader)
+            except Exception as e:
+                print(f"⚠️ Background refresh failed for cache '{self.name}' key {key}: {e}")
+            finally:
+                self._refreshing.discard(key)
+
+        # Start from an empty context so the refresh is not bound to the triggering request's deadline
+        task = contextvars.Context().run(asyncio.create_task, refresh())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> dict[str, Any]:
+        """Return size and hit/miss counters for this cache."""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            "negative_ttl": self.negative_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 3) if lookups else None,
+            "background_refreshes": self.refreshes,
+            "fallback_hits": self.fallback_hits,
+            "persistent": self._backend() is not None,
+            "backend_hits": self.backend_hits,
+            "remote_invalidations": self.remote_invalidations,
+        }
+
+def cache_stats() -> dict[str, Any]:
+    """Return statistics for every registered cache."""
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+def invalidate_cache(name: str, key: Hashable = None) -> bool:
+    """Invalidate a registered cache by name. Returns False if no such cache exists."""
+    cache = _caches.get(name)
+    if cache is None:
+        return False
+    cache.invalidate(key)
+    return True
+
+async def listen_for_invalidations():
+    """Apply invalidations made by other workers to this worker's in-memory caches, until cancelled."""
+    backend = get_cache_backend()
+    if backend is None:
+        return
+    seq, _ = await backend_read(backend.invalidations_since, None)
+    while True:
+        await asyncio.sleep(CACHE_INVALIDATION_POLL_INTERVAL)
+        seq, invalidations = await backend_read(backend.invalidations_since, seq)
+        for name, key in invalidations:
+            cache = _caches.get(name)
+            if cache is not None:
+                cache.apply_remote_invalidation(key)
+
+async def compact_cache_backend() -> int:
+    """Compact the shared backend on the writer thread. Returns the number of entries deleted."""
+    backend = get_cache_backend()
+    if backend is None:
+        return 0
+    return await asyncio.wrap_future(backend_write(backend.compact))
+
+async def run_compactions():
+    """Compact the shared backend now and every CACHE_BACKEND_COMPACT_INTERVAL seconds, until cancelled."""
+    while get_cache_backend() is not None:
+        await compact_cache_backend()
+        await asyncio.sleep(CACHE_BACKEND_COMPACT_INTERVAL)
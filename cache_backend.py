@@ -0,0 +1,144 @@
+import asyncio
+import json
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+# Shared tier under each worker's in-memory caches: "sqlite" keeps entries in DISK_CACHE_PATH,
+# "socket" in a cache server on CACHE_SOCKET_PATH shared by the workers of the node, "none" disables it
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite").lower()
+# How long entries are kept after they stopped being servable, as a fallback when Fusion is failing
+CACHE_BACKEND_RETENTION = float(os.getenv("CACHE_BACKEND_RETENTION", "604800"))
+# Seconds between two compactions, which run in the background
+CACHE_BACKEND_COMPACT_INTERVAL = float(os.getenv("CACHE_BACKEND_COMPACT_INTERVAL", "3600"))
+# Seconds between two checks for invalidations made by other workers
+CACHE_INVALIDATION_POLL_INTERVAL = float(os.getenv("CACHE_INVALIDATION_POLL_INTERVAL", "1.0"))
+
+class CacheBackend:
+    """Interface of the tier shared by the workers of a host, under their in-memory TTLCaches.
+
+    Values are stored encoded, with wall clock timestamps, since they outlive the
+    process and are read by other processes. Every invalidation is also appended
+    to a log that the other workers poll to drop their in-memory copies.
+    Implementations log and count their errors instead of raising, so a broken
+    backend only costs upstream calls.
+
+    Every method blocks, so code running on the event loop calls them through
+    backend_read() and backend_write(), which run them on worker threads.
+    """
+
+    kind = "none"
+
+    def get(self, cache: str, key: str) -> tuple[str, float, float] | None:
+        """Return (encoded value, stored_at, expires_at) of an entry, or None if it is not stored."""
+        raise NotImplementedError
+
+    def set(self, cache: str, key: str, value: str, ttl: float, keep_for: float):
+        """Store an encoded value that expires after ttl and may be deleted keep_for seconds after that."""
+        raise NotImplementedError
+
+    def invalidate(self, cache: str, key: str = None):
+        """Delete one entry, or every entry of a cache when no key is given, and tell the other workers."""
+        raise NotImplementedError
+
+    def invalidations_since(self, seq: int | None) -> tuple[int, list[tuple[str, str | None]]]:
+        """Return the latest invalidation sequence number and the (cache, key) invalidations other
+        workers made after seq. With seq None, only the latest sequence number is returned."""
+        raise NotImplementedError
+
+    def compact(self, max_entries: dict[str, int] = None) -> int:
+        """Delete entries past their retention and trim each cache to its size bound.
+
+        Args:
+            max_entries: Optional cache name → entries to keep, the most recently stored ones;
+                defaults to the size bounds of the registered caches
+
+        Returns:
+            Number of entries deleted.
+        """
+        raise NotImplementedError
+
+    def stats(self) -> dict[str, Any]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+_backend: CacheBackend | None = None
+_backend_failed = False
+_max_entries: dict[str, int] = {}
+
+# Reads run in parallel; writes, invalidations and compactions run one at a time, in the order they were made
+_readers = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-backend-reader")
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-backend-writer")
+
+async def backend_read(function: Callable, *args) -> Any:
+    """Run a blocking backend call on a reader thread, so a slow or locked backend never stalls the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(_readers, function, *args)
+
+def backend_write(function: Callable, *args) -> Future:
+    """Queue a blocking backend call on the writer thread without waiting for it."""
+    return _writer.submit(function, *args)
+
+def worker_id() -> str:
+    """Identify this worker's invalidations, so it does not apply them to itself a second time."""
+    return str(os.getpid())
+
+def open_cache_backend(kind: str) -> CacheBackend | None:
+    """Create the backend selected by CACHE_BACKEND."""
+    if kind == "sqlite":
+        from disk_cache import DiskCache, DISK_CACHE_PATH
+        return DiskCache(DISK_CACHE_PATH) if DISK_CACHE_PATH else None
+    if kind == "socket":
+        from socket_cache import SocketCacheBackend, CACHE_SOCKET_PATH
+        return SocketCacheBackend(CACHE_SOCKET_PATH)
+    if kind != "none":
+        print(f"⚠️ Unknown CACHE_BACKEND '{kind}', keeping caches in memory only")
+    return None
+
+def get_cache_backend() -> CacheBackend | None:
+    """Return the shared backend, opening it on first use, or None when disabled or unavailable."""
+    global _backend, _backend_failed
+    if _backend is None and not _backend_failed:
+        try:
+            _backend = open_cache_backend(CACHE_BACKEND)
+        except Exception as e:
+            print(f"⚠️ Cache backend '{CACHE_BACKEND}' unavailable, continuing with in-memory caches only: {e}")
+        if _backend is None:
+            _backend_failed = True
+    return _backend
+
+def register_cache(name: str, max_entries: int):
+    """Record a persisted cache's size bound, which compaction applies to its stored entries."""
+    _max_entries[name] = max_entries
+
+def registered_max_entries() -> dict[str, int]:
+    return dict(_max_entries)
+
+def close_cache_backend():
+    """Close the backend once the writes queued so far are applied. Blocks, so run it off the event loop."""
+    global _backend
+    if _backend is not None:
+        backend_write(_backend.close).result()
+        _backend = None
+
+def cache_backend_stats() -> dict[str, Any]:
+    """Report the shared cache tier, or that it is disabled."""
+    backend = get_cache_backend()
+    if backend is None:
+        return {"enabled": False, "backend": CACHE_BACKEND}
+    return {"enabled": True, "backend": backend.kind, "worker_id": worker_id(), **backend.stats()}
+
+class JsonCodec:
+    """Encode cache values as JSON, with optional conversions for values JSON cannot hold directly."""
+
+    def __init__(self, to_json: Callable[[Any], Any] = None, from_json: Callable[[Any], Any] = None):
+        self.to_json = to_json
+        self.from_json = from_json
+
+    def encode(self, value: Any) -> str:
+        return json.dumps(self.to_json(value) if self.to_json else value, separators=(",", ":"))
+
+    def decode(self, encoded: str) -> Any:
+        value = json.loads(encoded)
+        return self.from_json(value) if self.from_json else value
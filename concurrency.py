@@ -0,0 +1,243 @@
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any
+
+# Outbound concurrency configuration
+FUSION_MAX_CONCURRENCY = int(os.getenv("FUSION_MAX_CONCURRENCY", "32"))
+FUSION_BULKHEADS = os.getenv(
+    "FUSION_BULKHEADS",
+    "itemsV2=12,suppliers=16,inventoryOrganizations=8,workers=2,purchaseRequisitions=4"
+)
+
+# Adaptive (AIMD) concurrency configuration
+FUSION_ADAPTIVE_CONCURRENCY = os.getenv("FUSION_ADAPTIVE_CONCURRENCY", "true").lower() in ("1", "true", "yes")
+FUSION_ADAPTIVE_MIN_CONCURRENCY = int(os.getenv("FUSION_ADAPTIVE_MIN_CONCURRENCY", "4"))
+FUSION_ADAPTIVE_MAX_CONCURRENCY = int(os.getenv("FUSION_ADAPTIVE_MAX_CONCURRENCY", "128"))
+FUSION_ADAPTIVE_BACKOFF = float(os.getenv("FUSION_ADAPTIVE_BACKOFF", "0.7"))
+FUSION_ADAPTIVE_LATENCY_FACTOR = float(os.getenv("FUSION_ADAPTIVE_LATENCY_FACTOR", "2.5"))
+FUSION_ADAPTIVE_ERROR_RATE = float(os.getenv("FUSION_ADAPTIVE_ERROR_RATE", "0.1"))
+FUSION_ADAPTIVE_COOLDOWN = float(os.getenv("FUSION_ADAPTIVE_COOLDOWN", "1.0"))
+
+OVERLOAD_STATUS_CODES = (429, 503)
+# Latencies below this are never treated as a spike, however small the baseline
+MIN_SPIKE_LATENCY = 0.05
+
+class Bulkhead:
+    """A resizable FIFO semaphore that records how long callers wait for a slot."""
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self.acquired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def acquire(self):
+        """Wait for a free slot."""
+        started = time.monotonic()
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # A slot was handed over just as we were cancelled, pass it on
+                    self.release()
+                elif future in self._waiters:
+                    self._waiters.remove(future)
+                raise
+
+        waited = time.monotonic() - started
+        self.acquired += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+    def release(self):
+        """Free a slot and hand it to the next waiter."""
+        self.active -= 1
+        self._wake()
+
+    def set_limit(self, limit: int):
+        """Change the number of slots, waking waiters if it grew."""
+        self.limit = limit
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.active < self.limit:
+            future = self._waiters.popleft()
+            if not future.done():
+                self.active += 1
+                future.set_result(None)
+
+    def stats(self) -> dict[str, Any]:
+        """Return slot usage and queue-wait statistics."""
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": len(self._waiters),
+            "acquired": self.acquired,
+            "avg_wait_ms": round(self.total_wait / self.acquired * 1000, 2) if self.acquired else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+        }
+
+def _parse_bulkheads(spec: str) -> dict[str, Bulkhead]:
+    """Parse 'resource=limit,...' into one bulkhead per resource."""
+    bulkheads = {}
+    for entry in spec.split(","):
+        if "=" not in entry:
+            continue
+        resource, limit = entry.split("=", 1)
+        bulkheads[resource.strip()] = Bulkhead(resource.strip(), int(limit))
+    return bulkheads
+
+class AdaptiveConcurrencyLimit:
+    """AIMD controller that resizes a bulkhead from observed upstream health.
+
+    Every healthy call made while at least half the window is in use grows it by
+    1/window, so it gains roughly one slot per window's worth of calls. A 429/503, a latency spike above
+    ``latency_factor`` times the baseline latency, or an error rate above
+    ``error_rate_threshold`` shrinks it by ``backoff``, at most once per
+    ``cooldown`` seconds so a burst of failures counts as one signal.
+    """
+
+    def __init__(self, bulkhead: Bulkhead, min_limit: int, max_limit: int, backoff: float, latency_factor: float, error_rate_threshold: float, cooldown: float, enabled: bool = True):
+        self.bulkhead = bulkhead
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_factor = latency_factor
+        self.error_rate_threshold = error_rate_threshold
+        self.cooldown = cooldown
+        self.enabled = enabled
+        self.window = float(bulkhead.limit)
+        self.baseline_latency = None
+        self.error_rate = 0.0
+        self.increases = 0
+        self.decreases = 0
+        self.last_decrease_reason = None
+        self._last_decrease = 0.0
+
+    def record(self, latency: float, status_code: int = None, failed: bool = False):
+        """Feed the outcome of one upstream call into the controller."""
+        if not self.enabled:
+            return
+
+        errored = failed or (status_code is not None and status_code >= 500)
+        self.error_rate = self.error_rate * 0.9 + (0.1 if errored else 0.0)
+
+        reason = None
+        if status_code in OVERLOAD_STATUS_CODES:
+            reason = f"HTTP {status_code}"
+        elif self.baseline_latency and latency > max(self.baseline_latency * self.latency_factor, MIN_SPIKE_LATENCY):
+            reason = "latency spike"
+        elif self.error_rate > self.error_rate_threshold:
+            reason = "error rate"
+
+        if not errored:
+            # Slow-moving baseline so a lasting shift in latency is eventually accepted
+            if self.baseline_latency is None:
+                self.baseline_latency = latency
+            else:
+                self.baseline_latency = self.baseline_latency * 0.95 + latency * 0.05
+
+        now = time.monotonic()
+        if reason:
+            if now - self._last_decrease >= self.cooldown:
+                self.window = max(float(self.min_limit), self.window * self.backoff)
+                self._last_decrease = now
+                self.decreases += 1
+                self.last_decrease_reason = reason
+        elif not errored and self.bulkhead.active >= self.window / 2:
+            # Only grow while the window is actually in use, otherwise idle periods inflate it untested
+            self.window = min(float(self.max_limit), self.window + 1.0 / self.window)
+            self.increases += 1
+
+        self.bulkhead.set_limit(int(self.window))
+
+    def stats(self) -> dict[str, Any]:
+        """Return the current window and the signals that drive it."""
+        return {
+            "enabled": self.enabled,
+            "window": round(self.window, 2),
+            "limit": self.bulkhead.limit,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "baseline_latency_ms": round(self.baseline_latency * 1000, 2) if self.baseline_latency else None,
+            "error_rate": round(self.error_rate, 3),
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "last_decrease_reason": self.last_decrease_reason,
+        }
+
+class UpstreamCall:
+    """Outcome of one upstream call, filled in by the caller inside upstream_slot."""
+
+    def __init__(self, resource: str):
+        self.resource = resource
+        self.status_code = None
+
+global_bulkhead = Bulkhead("global", FUSION_MAX_CONCURRENCY)
+resource_bulkheads = _parse_bulkheads(FUSION_BULKHEADS)
+adaptive_limit = AdaptiveConcurrencyLimit(
+    global_bulkhead,
+    min_limit=FUSION_ADAPTIVE_MIN_CONCURRENCY,
+    max_limit=FUSION_ADAPTIVE_MAX_CONCURRENCY,
+    backoff=FUSION_ADAPTIVE_BACKOFF,
+    latency_factor=FUSION_ADAPTIVE_LATENCY_FACTOR,
+    error_rate_threshold=FUSION_ADAPTIVE_ERROR_RATE,
+    cooldown=FUSION_ADAPTIVE_COOLDOWN,
+    enabled=FUSION_ADAPTIVE_CONCURRENCY
+)
+
+# Upstream calls abandoned mid-flight, e.g. because the API client disconnected
+cancelled_calls: dict[str, int] = {}
+
+@asynccontextmanager
+async def upstream_slot(resource: str):
+    """Hold a slot in the resource's bulkhead and in the global limit for one upstream call.
+
+    The resource bulkhead is acquired first, so a saturated resource queues
+    without holding global slots that other resources could use. The caller sets
+    ``status_code`` on the yielded UpstreamCall so the adaptive limit can learn
+    from the outcome; cancelled calls are not counted.
+    """
+    bulkhead = resource_bulkheads.get(resource)
+    if bulkhead:
+        await bulkhead.acquire()
+    try:
+        await global_bulkhead.acquire()
+        call = UpstreamCall(resource)
+        started = time.monotonic()
+        try:
+            yield call
+        except asyncio.CancelledError:
+            cancelled_calls[resource] = cancelled_calls.get(resource, 0) + 1
+            raise
+        except Exception:
+            adaptive_limit.record(time.monotonic() - started, failed=True)
+            raise
+        else:
+            if call.status_code is not None:
+                adaptive_limit.record(time.monotonic() - started, call.status_code)
+        finally:
+            global_bulkhead.release()
+    finally:
+        if bulkhead:
+            bulkhead.release()
+
+def concurrency_stats() -> dict[str, Any]:
+    """Report limits, usage and queue-wait time for the global limit and every bulkhead."""
+    return {
+        "global": global_bulkhead.stats(),
+        "adaptive": adaptive_limit.stats(),
+        "cancelled_calls": dict(cancelled_calls),
+        "bulkheads": {name: bulkhead.stats() for name, bulkhead in resource_bulkheads.items()},
+    }
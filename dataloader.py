@@ -0,0 +1,141 @@
+import asyncio
+import functools
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Hashable
+
+# Combine lookups of the same kind made in one event loop tick into a single q= IN filter
+FUSION_BATCH_QUERIES = os.getenv("FUSION_BATCH_QUERIES", "true").lower() in ("1", "true", "yes")
+FUSION_BATCH_MAX_KEYS = int(os.getenv("FUSION_BATCH_MAX_KEYS", "50"))
+
+BatchLoad = Callable[[list], Awaitable[dict]]
+
+_stats: dict[str, dict[str, int]] = {}
+
+def _loader_stats(name: str) -> dict[str, int]:
+    stats = _stats.get(name)
+    if stats is None:
+        stats = _stats[name] = {"loads": 0, "memoized": 0, "batches": 0, "batched_keys": 0}
+    return stats
+
+class DataLoader:
+    """Request-scoped loader that fetches each key at most once.
+
+    Keys requested in the same event loop tick are collected and handed to
+    ``batch_load`` together, in batches of at most ``max_batch_size``.
+    ``batch_load`` returns a dictionary of results; keys missing from it
+    resolve to None.
+    """
+
+    def __init__(self, name: str, batch_load: BatchLoad, max_batch_size: int = FUSION_BATCH_MAX_KEYS):
+        self.name = name
+        self.batch_load = batch_load
+        self.max_batch_size = max_batch_size
+        self._results: dict[Hashable, asyncio.Future] = {}
+        self._queue: list[Hashable] = []
+        self._tasks: set[asyncio.Task] = set()
+
+    async def load(self, key: Hashable) -> Any:
+        """Return the value for key, sharing one fetch with every other load of it in this request."""
+        stats = _loader_stats(self.name)
+        stats["loads"] += 1
+        future = self._results.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._results[key] = loop.create_future()
+            self._queue.append(key)
+            if len(self._queue) == 1:
+                loop.call_soon(self._dispatch)
+        else:
+            stats["memoized"] += 1
+        # Shielded so one caller being cancelled does not fail the others waiting on the key
+        return await asyncio.shield(future)
+
+    def _dispatch(self):
+        keys, self._queue = self._queue, []
+        for start in range(0, len(keys), self.max_batch_size):
+            task = asyncio.ensure_future(self._run(keys[start:start + self.max_batch_size]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, keys: list):
+        stats = _loader_stats(self.name)
+        stats["batches"] += 1
+        stats["batched_keys"] += len(keys)
+        try:
+            values = await self.batch_load(keys)
+        except asyncio.CancelledError:
+            for key in keys:
+                self._results.pop(key).cancel()
+            raise
+        except Exception as e:
+            for key in keys:
+                future = self._results[key]
+                future.set_exception(e)
+                # Mark retrieved so an unobserved failure does not log a warning
+                future.exception()
+            return
+
+        for key in keys:
+            self._results[key].set_result(values.get(key))
+
+    def close(self):
+        """Cancel batches still running when the request that owns the loader ends."""
+        for task in list(self._tasks):
+            task.cancel()
+
+_loaders: ContextVar[dict[str, DataLoader] | None] = ContextVar("fusion_request_loaders", default=None)
+
+@contextmanager
+def request_loaders():
+    """Run the enclosed block with its own set of loaders.
+
+    Tasks started inside the block inherit the loaders through the context, so
+    every lookup made for one API request shares the same memo and batches.
+    """
+    loaders: dict[str, DataLoader] = {}
+    token = _loaders.set(loaders)
+    try:
+        yield loaders
+    finally:
+        _loaders.reset(token)
+        for loader in loaders.values():
+            loader.close()
+
+def request_scoped(func):
+    """Decorate a coroutine function so each call runs inside its own request_loaders() block."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        with request_loaders():
+            return await func(*args, **kwargs)
+    return wrapper
+
+async def load(name: str, key: Hashable, batch_load: BatchLoad) -> Any:
+    """Load one key through the current request's loader for name.
+
+    Outside a request_loaders() block, for example in a background cache
+    refresh, the key is fetched on its own.
+    """
+    loaders = _loaders.get()
+    if loaders is None:
+        return (await batch_load([key])).get(key)
+
+    loader = loaders.get(name)
+    if loader is None:
+        loader = loaders[name] = DataLoader(name, batch_load)
+    return await loader.load(key)
+
+def dataloader_stats() -> dict[str, Any]:
+    """Report loads, memoized hits and batch sizes per loader across all requests."""
+    return {
+        "batch_queries": FUSION_BATCH_QUERIES,
+        "max_batch_keys": FUSION_BATCH_MAX_KEYS,
+        "loaders": {
+            name: {
+                **stats,
+                "avg_batch_size": round(stats["batched_keys"] / stats["batches"], 2) if stats["batches"] else None,
+            }
+            for name, stats in _stats.items()
+        },
+    }
@@ -0,0 +1,39 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Default time budget in seconds for read endpoints, 0 disables it
+FUSION_REQUEST_DEADLINE = float(os.getenv("FUSION_REQUEST_DEADLINE", "30"))
+
+class Deadline:
+    """Time budget of one API request, shared by every upstream call it makes."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.exceeded = False
+
+    def remaining(self) -> float:
+        """Seconds left in the budget, negative once it has passed."""
+        return self.expires_at - time.monotonic()
+
+_current_deadline: ContextVar[Deadline | None] = ContextVar("fusion_request_deadline", default=None)
+
+@contextmanager
+def request_deadline(seconds: float | None):
+    """Run the enclosed block with a time budget that make_fusion_request honours.
+
+    Tasks started inside the block (asyncio.gather, create_task) inherit the
+    budget through the context. A budget of None or <= 0 means no deadline.
+    """
+    deadline = Deadline(seconds) if seconds and seconds > 0 else None
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+def current_deadline() -> Deadline | None:
+    """Return the deadline of the request being served, if any."""
+    return _current_deadline.get()
@@ -0,0 +1,208 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Any
+
+from cache_backend import CacheBackend, registered_max_entries, worker_id
+
+# SQLite file of the "sqlite" cache backend; reference data survives restarts and is shared by
+# every uvicorn worker on the host. Set to an empty string to keep caches in memory only
+DISK_CACHE_PATH = os.getenv("DISK_CACHE_PATH", "fusion_cache.sqlite3")
+# Seconds a cache read waits for a locked database file before it counts as a miss
+DISK_CACHE_BUSY_TIMEOUT = float(os.getenv("DISK_CACHE_BUSY_TIMEOUT", "0.1"))
+
+# Invalidations are kept this long, far longer than any worker takes to poll them
+INVALIDATION_LOG_RETENTION = 3600
+# Seconds writes wait for another worker's write lock; they run on the backend's writer thread, off the request path
+WRITE_LOCK_TIMEOUT = 5
+
+# Bump when the table layout or the encoding of any cached value changes;
+# a file written with another version is emptied when it is opened
+SCHEMA_VERSION = 2
+
+class DiskCache(CacheBackend):
+    """SQLite-backed cache backend.
+
+    The database runs in WAL mode, so workers read while another one writes.
+    Reads use their own connection with a short busy timeout, so they do not
+    queue behind writes or compactions waiting for the write lock. Each entry
+    keeps its own expiry; ``purge_at`` is when compaction may delete it.
+    Invalidations are appended to the ``invalidations`` table, which the other
+    workers poll.
+    """
+
+    kind = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        # The backend's reader threads share the read connection; writes come from its writer thread
+        self._lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=WRITE_LOCK_TIMEOUT, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        # With WAL, NORMAL only syncs on checkpoints; losing the last writes on power loss is fine for a cache
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self.reads = 0
+        self.read_hits = 0
+        self.writes = 0
+        self.errors = 0
+        self.compactions = 0
+        self.compacted_entries = 0
+        self._migrate()
+        self._read_connection = sqlite3.connect(path, timeout=DISK_CACHE_BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+
+    def _migrate(self):
+        with self._lock:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            row = self._connection.execute("SELECT value FROM meta WHERE name = 'schema_version'").fetchone()
+            if row is not None and int(row[0]) == SCHEMA_VERSION:
+                return
+            if row is not None:
+                print(f"🗄️ Disk cache {self.path} has schema version {row[0]}, expected {SCHEMA_VERSION}; discarding it")
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.execute("DROP TABLE IF EXISTS entries")
+                self._connection.execute("DROP TABLE IF EXISTS invalidations")
+                self._connection.execute(
+                    "CREATE TABLE entries ("
+                    " cache TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                    " stored_at REAL NOT NULL, expires_at REAL NOT NULL, purge_at REAL NOT NULL,"
+                    " PRIMARY KEY (cache, key))"
+                )
+                self._connection.execute("CREATE INDEX entries_purge_at ON entries (purge_at)")
+                self._connection.execute(
+                    "CREATE TABLE invalidations ("
+                    " seq INTEGER PRIMARY KEY AUTOINCREMENT, origin TEXT NOT NULL,"
+                    " cache TEXT NOT NULL, key TEXT, created_at REAL NOT NULL)"
+                )
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO meta (name, value) VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),)
+                )
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def get(self, cache: str, key: str) -> tuple[str, float, float] | None:
+        self.reads += 1
+        try:
+            with self._read_lock:
+                row = self._read_connection.execute(
+                    "SELECT value, stored_at, expires_at FROM entries WHERE cache = ? AND key = ? AND purge_at > ?",
+                    (cache, key, time.time())
+                ).fetchone()
+        except sqlite3.Error as e:
+            self._failed("read", e)
+            return None
+        if row is not None:
+            self.read_hits += 1
+        return row
+
+    def set(self, cache: str, key: str, value: str, ttl: float, keep_for: float):
+        now = time.time()
+        try:
+            with self._lock:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO entries (cache, key, value, stored_at, expires_at, purge_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (cache, key, value, now, now + ttl, now + ttl + keep_for)
+                )
+            self.writes += 1
+        except sqlite3.Error as e:
+            self._failed("write", e)
+
+    def invalidate(self, cache: str, key: str = None):
+        try:
+            with self._lock:
+                self._connection.execute("BEGIN IMMEDIATE")
+                try:
+                    if key is None:
+                        self._connection.execute("DELETE FROM entries WHERE cache = ?", (cache,))
+                    else:
+                        self._connection.execute("DELETE FROM entries WHERE cache = ? AND key = ?", (cache, key))
+                    self._connection.execute(
+                        "INSERT INTO invalidations (origin, cache, key, created_at) VALUES (?, ?, ?, ?)",
+                        (worker_id(), cache, key, time.time())
+                    )
+                    self._connection.execute("COMMIT")
+                except Exception:
+                    self._connection.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as e:
+            self._failed("invalidation", e)
+
+    def invalidations_since(self, seq: int | None) -> tuple[int, list[tuple[str, str | None]]]:
+        try:
+            with self._read_lock:
+                if seq is None:
+                    row = self._read_connection.execute("SELECT COALESCE(MAX(seq), 0) FROM invalidations").fetchone()
+                    return row[0], []
+                rows = self._read_connection.execute(
+                    "SELECT seq, origin, cache, key FROM invalidations WHERE seq > ? ORDER BY seq", (seq,)
+                ).fetchall()
+        except sqlite3.Error as e:
+            self._failed("invalidation poll", e)
+            return seq or 0, []
+        own = worker_id()
+        latest = rows[-1][0] if rows else seq
+        return latest, [(cache, key) for _, origin, cache, key in rows if origin != own]
+
+    def compact(self, max_entries: dict[str, int] = None) -> int:
+        """Delete expired entries and old invalidations, trim caches to their size bound and shrink the WAL."""
+        deleted = 0
+        try:
+            with self._lock:
+                deleted += self._connection.execute("DELETE FROM entries WHERE purge_at <= ?", (time.time(),)).rowcount
+                for cache, limit in (max_entries if max_entries is not None else registered_max_entries()).items():
+                    deleted += self._connection.execute(
+                        "DELETE FROM entries WHERE cache = ? AND key NOT IN "
+                        "(SELECT key FROM entries WHERE cache = ? ORDER BY stored_at DESC LIMIT ?)",
+                        (cache, cache, limit)
+                    ).rowcount
+                # Keep the newest invalidation so the sequence, and the workers' position in it, carries on
+                self._connection.execute(
+                    "DELETE FROM invalidations WHERE created_at <= ? AND seq < (SELECT MAX(seq) FROM invalidations)",
+                    (time.time() - INVALIDATION_LOG_RETENTION,)
+                )
+                self._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as e:
+            self._failed("compaction", e)
+            return deleted
+        self.compactions += 1
+        self.compacted_entries += deleted
+        if deleted:
+            print(f"🗄️ Compacted disk cache {self.path}: {deleted} entries removed")
+        return deleted
+
+    def _failed(self, operation: str, error: Exception):
+        # A broken or locked cache file must never fail the request; it only costs upstream calls
+        self.errors += 1
+        print(f"⚠️ Disk cache {operation} failed on {self.path}: {error}")
+
+    def stats(self) -> dict[str, Any]:
+        """Return entry counts per cache, file size and read/write counters."""
+        entries = {}
+        try:
+            with self._read_lock:
+                for cache, count in self._read_connection.execute("SELECT cache, COUNT(*) FROM entries GROUP BY cache"):
+                    entries[cache] = count
+        except sqlite3.Error as e:
+            self._failed("stats", e)
+        return {
+            "path": self.path,
+            "schema_version": SCHEMA_VERSION,
+            "file_bytes": sum(os.path.getsize(path) for path in (self.path, self.path + "-wal") if os.path.exists(path)),
+            "entries": entries,
+            "reads": self.reads,
+            "read_hits": self.read_hits,
+            "writes": self.writes,
+            "errors": self.errors,
+            "compactions": self.compactions,
+            "compacted_entries": self.compacted_entries,
+        }
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+        with self._read_lock:
+            self._read_connection.close()
@@ -0,0 +1,182 @@
+from dataclasses import dataclass
+from typing import Any
+
+# Compact, read-only forms of the Fusion rows the listings formatter reads. Raw rows carry
+# every projected attribute plus links; these keep only what ends up in a response.
+
+@dataclass(slots=True, frozen=True)
+class InventoryOrg:
+    """An inventory organization with its resolved deliver-to location."""
+    organization_id: Any
+    organization_name: str | None
+    organization_code: str | None
+    inventory_flag: bool
+    location_id: Any = None
+
+    @classmethod
+    def from_fusion(cls, org: dict, location_id: Any = None) -> "InventoryOrg":
+        return cls(
+            organization_id=org.get('OrganizationId'),
+            organization_name=org.get('OrganizationName'),
+            organization_code=org.get('OrganizationCode'),
+            inventory_flag=bool(org.get('InventoryFlag')),
+            location_id=location_id,
+        )
+
+    @property
+    def delivers(self) -> bool:
+        """True if requisition lines can be delivered to this organization."""
+        return bool(self.inventory_flag and self.organization_id and self.location_id)
+
+class BusinessUnitOrgs:
+    """The inventory organizations of one business unit, indexed by organization ID.
+
+    Instances live in the reference data cache and are shared by every request
+    and every site of the business unit, so they must not be modified.
+    """
+
+    __slots__ = ("orgs", "orgs_by_id", "deliveries_by_id", "deliveries")
+
+    def __init__(self, orgs: tuple):
+        # IDs are compared as strings, since Fusion returns them as numbers in some payloads and strings in others
+        self.orgs = orgs
+        self.orgs_by_id = {}
+        self.deliveries_by_id = {}
+        deliveries = []
+        for org in orgs:
+            org_key = str(org.organization_id)
+            self.orgs_by_id.setdefault(org_key, org)
+            if org.delivers:
+                self.deliveries_by_id.setdefault(org_key, []).append(org)
+                deliveries.append(org)
+        self.deliveries = tuple(deliveries)
+
+    def to_json(self) -> list:
+        """Serialize for the disk cache."""
+        return [[org.organization_id, org.organization_name, org.organization_code, org.inventory_flag, org.location_id] for org in self.orgs]
+
+    @classmethod
+    def from_json(cls, orgs: list) -> "BusinessUnitOrgs":
+        return cls(tuple(InventoryOrg(*org) for org in orgs))
+
+    def deliveries_for(self, org_key: str) -> list | tuple:
+        """Organizations to deliver to for an organization: itself, or every deliverable one when it has no location."""
+        return self.deliveries_by_id.get(org_key) or self.deliveries
+
+@dataclass(slots=True, frozen=True)
+class SupplierSite:
+    supplier_site: str | None
+    procurement_bu_id: Any
+    procurement_bu: str | None
+    purchasing: bool
+    pay: bool
+
+    @classmethod
+    def from_fusion(cls, site: dict) -> "SupplierSite":
+        return cls(
+            supplier_site=site.get('SupplierSite'),
+            procurement_bu_id=site.get('ProcurementBUId'),
+            procurement_bu=site.get('ProcurementBU'),
+            purchasing=bool(site.get('SitePurposePurchasingFlag')),
+            pay=bool(site.get('SitePurposePayFlag')),
+        )
+
+@dataclass(slots=True, frozen=True)
+class Supplier:
+    supplier_id: Any
+    supplier_party_id: Any
+    supplier_name: str | None
+
+@dataclass(slots=True, frozen=True)
+class ItemSupplier:
+    """A supplier of one item organization and the sites shown for it."""
+    supplier: Supplier
+    sites: tuple
+
+@dataclass(slots=True, frozen=True)
+class Item:
+    item_id: Any
+    item_number: str | None
+    description: str | None
+    primary_uom: str | None
+    item_class: str | None
+    status: str | None
+    purchasable: Any
+    organization_id: Any
+    organization_code: str | None
+    list_price: Any
+
+    @classmethod
+    def from_fusion(cls, item: dict) -> "Item":
+        return cls(
+            item_id=item.get('ItemId'),
+            item_number=item.get('ItemNumber'),
+            description=item.get('ItemDescription'),
+            primary_uom=item.get('PrimaryUOMValue'),
+            item_class=item.get('ItemClass'),
+            status=item.get('ItemStatusValue'),
+            purchasable=item.get('PurchasableFlag'),
+            organization_id=item.get('OrganizationId'),
+            organization_code=item.get('OrganizationCode'),
+            list_price=item.get('ListPrice'),
+        )
+
+    @property
+    def key(self) -> tuple:
+        return (self.item_id, self.organization_id)
+
+class EntityGraph:
+    """Every entity one listings search has seen, each stored once by ID.
+
+    Items point to their suppliers, suppliers to their sites, and sites to their
+    business unit by ID, so a supplier shared by many items, or an organization
+    list shared by many sites, is held once instead of being copied into each.
+    """
+
+    __slots__ = ("items", "suppliers", "supplier_sites", "business_units", "item_suppliers")
+
+    def __init__(self):
+        self.items: dict[tuple, Item] = {}
+        self.suppliers: dict[str, Supplier] = {}
+        self.supplier_sites: dict[str, tuple] = {}
+        self.business_units: dict[str, BusinessUnitOrgs] = {}
+        self.item_suppliers: dict[tuple, list] = {}
+
+    def add_item(self, item: dict) -> Item:
+        entity = Item.from_fusion(item)
+        return self.items.setdefault(entity.key, entity)
+
+    def add_supplier(self, supplier_id, supplier_party_id, supplier_name: str) -> Supplier:
+        supplier = self.suppliers.get(str(supplier_id))
+        if supplier is None:
+            supplier = self.suppliers[str(supplier_id)] = Supplier(supplier_id, supplier_party_id, supplier_name)
+        return supplier
+
+    def add_supplier_sites(self, supplier_id, sites: list) -> tuple:
+        """Store a supplier's sites, converting the Fusion rows only the first time the supplier is seen."""
+        entities = self.supplier_sites.get(str(supplier_id))
+        if entities is None:
+            entities = self.supplier_sites[str(supplier_id)] = tuple(SupplierSite.from_fusion(site) for site in sites)
+        return entities
+
+    def add_business_unit(self, bu_id, orgs: BusinessUnitOrgs):
+        self.business_units[str(bu_id)] = orgs
+
+    def business_unit(self, bu_id) -> BusinessUnitOrgs | None:
+        return self.business_units.get(str(bu_id)) if bu_id else None
+
+    def set_item_suppliers(self, item: Item, suppliers: list):
+        self.item_suppliers[item.key] = suppliers
+
+    def suppliers_of(self, item: Item) -> list:
+        return self.item_suppliers.get(item.key, [])
+
+    def stats(self) -> dict[str, int]:
+        """Count the entities held, for logging and benchmarks."""
+        return {
+            "items": len(self.items),
+            "suppliers": len(self.suppliers),
+            "sites": sum(len(sites) for sites in self.supplier_sites.values()),
+            "business_units": len(self.business_units),
+            "inventory_orgs": sum(len(orgs.orgs) for orgs in self.business_units.values()),
+        }
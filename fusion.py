@@ -3,6 +3,7 @@ import httpx
 import os
 import json
 from mcp.server.fastmcp import FastMCP
+from fusion_http import get_client, FUSION_TIMEOUT
 
 
 try:
@@ -53,45 +54,45 @@ async def make_fusion_request(endpoint: str, method: str = "GET", data: dict = N
     }
     
     url = f"{FUSION_API_BASE}{endpoint}"
+    client = get_client(use_write_auth)
     
-    async with httpx.AsyncClient() as client:
-        try:
-            if method.upper() == "GET":
-                response = await client.get(url, headers=headers, timeout=30.0)
-            elif method.upper() == "POST":
-                response = await client.post(url, headers=headers, json=data, timeout=30.0)
-            elif method.upper() == "PUT":
-                response = await client.put(url, headers=headers, json=data, timeout=30.0)
-            elif method.upper() == "DELETE":
-                response = await client.delete(url, headers=headers, timeout=30.0)
-            else:
-                return None
-                
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPStatusError as e:
-            # Generate curl command for debugging
-            curl_cmd = f"curl -X {method.upper()} \\\n"
-            curl_cmd += f"  '{url}' \\\n"
-            for key, value in headers.items():
-                curl_cmd += f"  -H '{key}: {value}' \\\n"
-            if data and method.upper() in ["POST", "PUT"]:
-                import json
-                curl_cmd += f"  -d '{json.dumps(data, separators=(',', ':'))}'"
-            else:
-                curl_cmd = curl_cmd.rstrip(' \\\n')
-            
-            print(f"\n🚨 HTTP Error - Debug with this curl command:")
-            print(f"{curl_cmd}\n")
+    try:
+        if method.upper() == "GET":
+            response = await client.get(url, headers=headers, timeout=FUSION_TIMEOUT)
+        elif method.upper() == "POST":
+            response = await client.post(url, headers=headers, json=data, timeout=FUSION_TIMEOUT)
+        elif method.upper() == "PUT":
+            response = await client.put(url, headers=headers, json=data, timeout=FUSION_TIMEOUT)
+        elif method.upper() == "DELETE":
+            response = await client.delete(url, headers=headers, timeout=FUSION_TIMEOUT)
+        else:
+            return None
             
-            try:
-                error_details = e.response.json()
-                error_message = f"HTTP {e.response.status_code}: {error_details}"
-                return {"error": error_message, "status_code": e.response.status_code}
-            except:
-                return {"error": f"HTTP {e.response.status_code}: {e.response.text}", "status_code": e.response.status_code}
-        except Exception as e:
-            return {"error": str(e), "status_code": None}
+        response.raise_for_status()
+        return response.json()
+    except httpx.HTTPStatusError as e:
+        # Generate curl command for debugging
+        curl_cmd = f"curl -X {method.upper()} \\\n"
+        curl_cmd += f"  '{url}' \\\n"
+        for key, value in headers.items():
+            curl_cmd += f"  -H '{key}: {value}' \\\n"
+        if data and method.upper() in ["POST", "PUT"]:
+            import json
+            curl_cmd += f"  -d '{json.dumps(data, separators=(',', ':'))}'"
+        else:
+            curl_cmd = curl_cmd.rstrip(' \\\n')
+        
+        print(f"\n🚨 HTTP Error - Debug with this curl command:")
+        print(f"{curl_cmd}\n")
+        
+        try:
+            error_details = e.response.json()
+            error_message = f"HTTP {e.response.status_code}: {error_details}"
+            return {"error": error_message, "status_code": e.response.status_code}
+        except:
+            return {"error": f"HTTP {e.response.status_code}: {e.response.text}", "status_code": e.response.status_code}
+    except Exception as e:
+        return {"error": str(e), "status_code": None}
 
 async def get_user_business_units() -> list[str]:
     """Get the business unit IDs that the user has access to from HCM API.
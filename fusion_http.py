@@ -0,0 +1,196 @@
+import asyncio
+import contextvars
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable
+
+import httpx
+
+try:
+    import h2
+except ImportError:
+    h2 = None
+
+# Connection pool configuration
+FUSION_HTTP2 = os.getenv("FUSION_HTTP2", "false").lower() in ("1", "true", "yes")
+FUSION_MAX_CONNECTIONS = int(os.getenv("FUSION_MAX_CONNECTIONS", "100"))
+FUSION_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("FUSION_MAX_KEEPALIVE_CONNECTIONS", "20"))
+FUSION_KEEPALIVE_EXPIRY = float(os.getenv("FUSION_KEEPALIVE_EXPIRY", "30"))
+FUSION_TIMEOUT = float(os.getenv("FUSION_TIMEOUT", "30"))
+FUSION_COALESCE_GETS = os.getenv("FUSION_COALESCE_GETS", "true").lower() in ("1", "true", "yes")
+
+READ_POOL = "read"
+WRITE_POOL = "write"
+
+# One long-lived client per auth identity, so read and write traffic never share sockets
+_clients: dict[str, httpx.AsyncClient] = {}
+_client_loops: dict[str, asyncio.AbstractEventLoop] = {}
+_client_closers: dict[str, AsyncIterator[None]] = {}
+_request_counts: dict[str, int] = {READ_POOL: 0, WRITE_POOL: 0}
+
+# Identical requests currently in flight, keyed by (method, url, pool)
+_in_flight: dict[Hashable, "_Flight"] = {}
+_coalescing_counts = {"upstream_calls": 0, "coalesced_calls": 0}
+
+class _Flight:
+    """A shared upstream call and the number of callers waiting on it."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+def pool_name(use_write_auth: bool) -> str:
+    """Return the connection pool name for the given auth identity."""
+    return WRITE_POOL if use_write_auth else READ_POOL
+
+def resource_name(endpoint: str) -> str:
+    """Return the top-level Fusion REST resource an endpoint belongs to.
+
+    For example '/fscmRestApi/resources/11.13.18.05/suppliers/1/child/sites'
+    belongs to 'suppliers'. Unrecognised paths are reported as 'other'.
+    """
+    path = endpoint.split("?", 1)[0]
+    parts = [part for part in path.split("/") if part]
+    if "resources" in parts:
+        index = parts.index("resources") + 2
+        if index < len(parts):
+            return parts[index]
+    return "other"
+
+def _build_client(pool: str) -> httpx.AsyncClient:
+    """Create a pooled client with the configured keep-alive limits."""
+    http2 = FUSION_HTTP2
+    if http2 and h2 is None:
+        print("⚠️ FUSION_HTTP2 is enabled but the 'h2' package is not installed, falling back to HTTP/1.1")
+        http2 = False
+
+    async def count_request(request: httpx.Request):
+        _request_counts[pool] += 1
+
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=FUSION_MAX_CONNECTIONS,
+            max_keepalive_connections=FUSION_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=FUSION_KEEPALIVE_EXPIRY,
+        ),
+        timeout=FUSION_TIMEOUT,
+        event_hooks={"request": [count_request]},
+    )
+
+async def _close_with_loop(client: httpx.AsyncClient) -> AsyncIterator[None]:
+    """Close a client when its event loop shuts down.
+
+    Event loops finalize the async generators still alive on shutdown (asyncio.run()
+    does), so the client is closed while its loop can still shut its connections
+    down. Closing it from a later loop fails, since its sockets belong to this one.
+    """
+    try:
+        yield
+    finally:
+        if not client.is_closed:
+            await client.aclose()
+
+def get_client(use_write_auth: bool = False) -> httpx.AsyncClient:
+    """Get the shared client for the read or write pool, creating it on first use.
+
+    A client is rebuilt if it was created on a different event loop, which keeps
+    scripts that call asyncio.run() more than once working. The replaced client
+    is closed when its loop shuts down, or right away if its loop still runs in
+    another thread.
+    """
+    pool = pool_name(use_write_auth)
+    loop = asyncio.get_running_loop()
+    client = _clients.get(pool)
+    if client is None or client.is_closed or _client_loops.get(pool) is not loop:
+        if client is not None and not client.is_closed and _client_loops[pool].is_running():
+            asyncio.run_coroutine_threadsafe(client.aclose(), _client_loops[pool])
+        client = _build_client(pool)
+        _clients[pool] = client
+        _client_loops[pool] = loop
+        # Start the closer so the loop tracks it; holding it keeps it from being finalized early
+        closer = _client_closers[pool] = _close_with_loop(client)
+        asyncio.ensure_future(closer.__anext__())
+    return client
+
+async def close_clients():
+    """Close every pooled client. Called from the application lifespan on shutdown."""
+    clients = list(_clients.values())
+    _clients.clear()
+    _client_loops.clear()
+    _client_closers.clear()
+    for client in clients:
+        if not client.is_closed:
+            await client.aclose()
+
+def pool_stats() -> dict[str, Any]:
+    """Report connection usage for each pool so the limits can be sized under load."""
+    stats = {
+        "config": {
+            "http2": FUSION_HTTP2 and h2 is not None,
+            "max_connections": FUSION_MAX_CONNECTIONS,
+            "max_keepalive_connections": FUSION_MAX_KEEPALIVE_CONNECTIONS,
+            "keepalive_expiry": FUSION_KEEPALIVE_EXPIRY,
+        },
+        "pools": {},
+    }
+
+    for pool in (READ_POOL, WRITE_POOL):
+        pool_data = {"open": False, "requests": _request_counts[pool]}
+        client = _clients.get(pool)
+        if client is not None and not client.is_closed:
+            pool_data["open"] = True
+            # httpx does not expose pool internals publicly, so read them defensively
+            connection_pool = getattr(getattr(client, "_transport", None), "_pool", None)
+            connections = getattr(connection_pool, "connections", None)
+            if connections is not None:
+                pool_data["connections"] = len(connections)
+                pool_data["idle"] = len([c for c in connections if c.is_idle()])
+                pool_data["active"] = pool_data["connections"] - pool_data["idle"]
+                pending = getattr(connection_pool, "_requests", [])
+                pool_data["queued_requests"] = len([r for r in pending if r.is_queued()])
+        stats["pools"][pool] = pool_data
+
+    return stats
+
+async def coalesce(key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+    """Share one upstream call between every concurrent caller with the same key.
+
+    The call runs in its own task, so one caller being cancelled does not affect
+    the others. It is only cancelled once every caller waiting on it has gone.
+    """
+    flight = _in_flight.get(key)
+    if flight is None:
+        # Run in an empty context so the shared call is not bound to the first caller's deadline;
+        # each caller applies its own budget while waiting
+        flight = _Flight(contextvars.Context().run(asyncio.ensure_future, call()))
+        _in_flight[key] = flight
+        _coalescing_counts["upstream_calls"] += 1
+
+        def release(task, key=key, flight=flight):
+            if _in_flight.get(key) is flight:
+                del _in_flight[key]
+
+        flight.task.add_done_callback(release)
+    else:
+        _coalescing_counts["coalesced_calls"] += 1
+
+    flight.waiters += 1
+    try:
+        return await asyncio.shield(flight.task)
+    finally:
+        flight.waiters -= 1
+        if flight.waiters == 0 and not flight.task.done():
+            flight.task.cancel()
+
+def coalescing_stats() -> dict[str, Any]:
+    """Report how many upstream GETs were collapsed onto an identical in-flight call."""
+    upstream_calls = _coalescing_counts["upstream_calls"]
+    coalesced_calls = _coalescing_counts["coalesced_calls"]
+    total = upstream_calls + coalesced_calls
+    return {
+        "enabled": FUSION_COALESCE_GETS,
+        "upstream_calls": upstream_calls,
+        "coalesced_calls": coalesced_calls,
+        "coalesced_ratio": round(coalesced_calls / total, 3) if total else None,
+        "in_flight": len(_in_flight),
+    }
@@ -0,0 +1,59 @@
+import os
+
+# Push optional filters (business unit, inventory flag) into the q= parameter instead of filtering
+# downloaded rows in Python. Callers always re-apply them locally, so this only trims payloads
+FUSION_QUERY_PUSHDOWN = os.getenv("FUSION_QUERY_PUSHDOWN", "true").lower() in ("1", "true", "yes")
+
+def literal(value) -> str:
+    """Render a string literal for a q= expression, escaping embedded quotes."""
+    escaped = str(value).replace("'", "''")
+    return f"'{escaped}'"
+
+def eq(field: str, value, quote: bool = False) -> str:
+    """Build an equality predicate such as "PersonId=100" or "SupplierPartyId='100'"."""
+    return f"{field}={literal(value) if quote else value}"
+
+def like_prefix(field: str, prefix: str) -> str:
+    """Build a prefix match predicate such as "ItemNumber LIKE 'BRAKE%'"."""
+    return f"{field} LIKE {literal(str(prefix) + '%')}"
+
+def in_filter(field: str, values, quote: bool = False) -> str:
+    """Build an IN predicate such as "OrganizationId in (204,205)"."""
+    rendered = [literal(value) if quote else str(value) for value in values]
+    return f"{field} in ({','.join(rendered)})"
+
+def fusion_query(path: str, q: list = None, filters: list = None, limit: int = None, only_data: bool = False, expand: str = None) -> str:
+    """Build a Fusion REST endpoint with its query parameters.
+
+    Args:
+        path: Resource path, e.g. SUPPLIERS_ENDPOINT
+        q: Predicates the query depends on, always sent
+        filters: Predicates the caller also applies locally, sent only when
+            FUSION_QUERY_PUSHDOWN is enabled
+        limit: Page size. Dropped together with the filters when they are not
+            pushed down, since the page would then be cut before filtering
+        only_data: Ask Fusion to leave out links, for callers that never follow them
+        expand: Child resources to expand
+
+    Returns:
+        The endpoint path with its query string.
+    """
+    predicates = [predicate for predicate in (q or []) if predicate]
+    optional = [predicate for predicate in (filters or []) if predicate]
+    if optional:
+        if FUSION_QUERY_PUSHDOWN:
+            predicates.extend(optional)
+        else:
+            limit = None
+
+    params = []
+    if predicates:
+        params.append(f"q={' and '.join(predicates)}")
+    if expand:
+        params.append(f"expand={expand}")
+    if limit is not None:
+        params.append(f"limit={limit}")
+    if only_data:
+        params.append("onlyData=true")
+
+    return f"{path}?{'&'.join(params)}" if params else path
@@ -1,22 +1,105 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Union, List
-from services import find_matching_listings, retrieve_supplier_detail, submit_purchase_requisition, retrieve_supplier_ratings
+from typing import Any, AsyncIterator, Awaitable, Literal, Union, List
+from contextlib import asynccontextmanager
+import asyncio
+from services import find_matching_listings, stream_matching_listings, purge_listing_results, retrieve_supplier_detail, submit_purchase_requisition, retrieve_supplier_ratings
+from fusion_http import close_clients, pool_stats, coalescing_stats
+from concurrency import concurrency_stats, adaptive_limit
+from resilience import resilience_stats, breaker_stats, OPEN
+from deadline import request_deadline, FUSION_REQUEST_DEADLINE
+from cache import cache_stats, invalidate_cache, listen_for_invalidations, run_compactions, compact_cache_backend
+from cache_backend import cache_backend_stats, get_cache_backend, close_cache_backend, backend_read
+from query_planner import query_planner_stats
+from dataloader import dataloader_stats
+from projections import projection_stats, set_projection_enabled, PROJECTION_PROFILES
 import json
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the shared cache tier, compact it in the background and follow the other workers' invalidations
+    await asyncio.to_thread(get_cache_backend)
+    background_tasks = [asyncio.create_task(run_compactions()), asyncio.create_task(listen_for_invalidations())]
+    yield
+    for task in background_tasks:
+        task.cancel()
+    # Release pooled upstream connections on shutdown
+    await close_clients()
+    await asyncio.to_thread(close_cache_backend)
+
 app = FastAPI(
     title="Fusion Procurement Tools",
     description="Oracle Fusion Cloud ERP procurement tools API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    if request.method == "POST":
-        body = await request.body()
-        print(f"📥 Raw request body: {body.decode()}")
-    response = await call_next(request)
-    return response
+class LogRequestsMiddleware:
+    """Log raw POST bodies as they are received.
+
+    Written as plain ASGI middleware because @app.middleware("http") hides client
+    disconnects from the endpoints, which run_until_disconnect relies on.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        body = b""
+
+        async def logging_receive():
+            nonlocal body
+            message = await receive()
+            if message["type"] == "http.request":
+                body += message.get("body", b"")
+                if not message.get("more_body"):
+                    print(f"📥 Raw request body: {body.decode()}")
+            return message
+
+        await self.app(scope, logging_receive, send)
+
+app.add_middleware(LogRequestsMiddleware)
+
+# How often a running request checks whether its API client is still connected (seconds)
+DISCONNECT_POLL_INTERVAL = 0.25
+
+# Requests whose upstream work was cancelled because the client went away, per endpoint
+disconnect_cancellations: dict[str, int] = {}
+
+class ClientDisconnected(Exception):
+    """The API client closed the connection before the response was ready."""
+
+async def run_until_disconnect(http_request: Request, work: Awaitable[Any]) -> Any:
+    """Run work for a request, cancelling its whole task tree if the client disconnects.
+
+    Cancellation propagates through the asyncio.gather fan-out in services.py down
+    to the in-flight httpx requests.
+    """
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                break
+    finally:
+        if not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    path = http_request.url.path
+    disconnect_cancellations[path] = disconnect_cancellations.get(path, 0) + 1
+    print(f"🔌 Client disconnected from {path}, cancelled upstream work")
+    raise ClientDisconnected()
 
 class ListingsRequest(BaseModel):
     product_query_terms: Union[str, List[str]] = Field(
@@ -24,10 +107,32 @@ class ListingsRequest(BaseModel):
         description="Search terms - provide multiple variations for comprehensive results including singular, plural, and hyphenated forms to ensure complete product matches"
     )
     limit: int = 10
+    max_suppliers: int = Field(
+        default=2,
+        ge=1,
+        alias="maxSuppliers",
+        description="Suppliers to return per item organization. Only these are looked up, so ask for more only when needed"
+    )
+    max_sites: int = Field(
+        default=2,
+        ge=1,
+        alias="maxSites",
+        description="Supplier sites to return per supplier"
+    )
+    timeout_seconds: Union[float, None] = Field(
+        default=None,
+        alias="timeoutSeconds",
+        description="Overall time budget in seconds. When it runs out, the products enriched so far are returned with partial: true"
+    )
+    stream: Union[Literal["ndjson", "sse"], None] = Field(
+        default=None,
+        description="Stream each product as soon as it is ready, as NDJSON lines or server-sent events, followed by a summary record"
+    )
 
 class SupplierDetailRequest(BaseModel):
     supplier_id: str = Field(alias="supplierId")
     bu_id: Union[str, None] = Field(default=None, alias="buId")
+    timeout_seconds: Union[float, None] = Field(default=None, alias="timeoutSeconds")
 
 class PurchaseRequisitionRequest(BaseModel):
     listing_id: str = Field(alias="listingId")
@@ -40,6 +145,84 @@ class PurchaseRequisitionRequest(BaseModel):
 class SupplierRatingsRequest(BaseModel):
     supplier_id: str = Field(alias="supplierId")
 
+def resolve_deadline(body_timeout: Union[float, None], header_timeout: Union[float, None]) -> float:
+    """Pick the request's time budget: request field first, then X-Request-Timeout header, then the server default."""
+    if body_timeout is not None:
+        return body_timeout
+    if header_timeout is not None:
+        return header_timeout
+    return FUSION_REQUEST_DEADLINE
+
+# Media types of the streaming response modes
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+def accept_qualities(accept: str) -> dict[str, float]:
+    """Map each media range of an Accept header to its q-value, keeping the first listing of a range."""
+    qualities = {}
+    for media_range in accept.split(","):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type:
+            qualities.setdefault(media_type.lower(), quality)
+    return qualities
+
+def resolve_stream_mode(body_stream: Union[str, None], accept: Union[str, None]) -> Union[str, None]:
+    """Pick the streaming mode: request field first, then an Accept header that prefers NDJSON or SSE.
+
+    Streaming stays opt-in: clients such as MCP ones accept both JSON and event
+    streams, so a stream media type is only picked when its q-value is higher
+    than JSON's, or JSON is not acceptable at all.
+    """
+    if body_stream:
+        return body_stream
+    if not accept:
+        return None
+    qualities = accept_qualities(accept)
+    json_quality = next((qualities[media_type] for media_type in ("application/json", "application/*", "*/*")
+                         if media_type in qualities), 0.0)
+    preferred = max(STREAM_MEDIA_TYPES, key=lambda mode: qualities.get(STREAM_MEDIA_TYPES[mode], 0.0))
+    if qualities.get(STREAM_MEDIA_TYPES[preferred], 0.0) > json_quality:
+        return preferred
+    return None
+
+def format_stream_event(mode: str, event: dict) -> str:
+    """Encode one stream record as an NDJSON line or a server-sent event."""
+    payload = json.dumps(event, default=str)
+    if mode == "sse":
+        return f"event: {event['type']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+async def stream_listings_response(request: ListingsRequest, deadline_seconds: float, mode: str, path: str) -> AsyncIterator[str]:
+    """Stream find_matching_listings products followed by the summary record.
+
+    The deadline is applied here rather than in the endpoint, since the body is
+    produced after the endpoint has returned. If the client disconnects, the
+    response is cancelled and the search's outstanding upstream work with it.
+    """
+    try:
+        with request_deadline(deadline_seconds) as deadline:
+            async for event in stream_matching_listings(request.product_query_terms, request.limit, request.max_suppliers, request.max_sites):
+                if event["type"] == "summary" and deadline and deadline.exceeded:
+                    print(f"⏱️ Deadline of {deadline.seconds}s exceeded, ending stream with partial result")
+                    event["partial"] = True
+                yield format_stream_event(mode, event)
+        print(f"✅ Success, stream complete")
+    except asyncio.CancelledError:
+        disconnect_cancellations[path] = disconnect_cancellations.get(path, 0) + 1
+        print(f"🔌 Client disconnected from {path}, cancelled upstream work")
+        raise
+    except Exception as e:
+        # The status line is already sent, so report the failure as the last record
+        print(f"❌ Error in find_matching_listings stream: {str(e)}")
+        yield format_stream_event(mode, {"type": "error", "detail": str(e)})
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -47,33 +230,107 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy"}
+    """Health check endpoint, including the state of the upstream circuit breakers"""
+    breakers = breaker_stats()
+    degraded = any(breaker["state"] == OPEN for breaker in breakers.values())
+    return {"status": "degraded" if degraded else "healthy", "circuit_breakers": breakers}
+
+@app.get("/metrics")
+async def metrics():
+    """Upstream connection pool, concurrency, retry, request coalescing and cache statistics"""
+    return {
+        "http_pools": pool_stats(),
+        "concurrency": concurrency_stats(),
+        "resilience": resilience_stats(),
+        "disconnect_cancellations": dict(disconnect_cancellations),
+        "coalescing": coalescing_stats(),
+        "query_planner": query_planner_stats(),
+        "dataloaders": dataloader_stats(),
+        "projections": projection_stats(),
+        "caches": cache_stats(),
+        "cache_backend": await backend_read(cache_backend_stats)
+    }
+
+@app.get("/admin/concurrency")
+async def adaptive_concurrency_endpoint():
+    """Current adaptive concurrency window against the Fusion pod"""
+    return adaptive_limit.stats()
+
+@app.get("/admin/projections")
+async def projections_endpoint():
+    """Field projection profiles per Fusion resource, with payload size and parse time per endpoint"""
+    return {"profiles": PROJECTION_PROFILES, **projection_stats()}
+
+@app.put("/admin/projections")
+async def set_projections_endpoint(enabled: bool):
+    """Turn field projection on or off, e.g. to fetch full rows while debugging a missing attribute."""
+    set_projection_enabled(enabled)
+    return projection_stats()
+
+@app.delete("/admin/cache/{cache_name}")
+async def invalidate_cache_endpoint(cache_name: str, key: Union[str, None] = None):
+    """Invalidate a cache by name, or a single entry when a key is given."""
+    if not invalidate_cache(cache_name, key):
+        raise HTTPException(status_code=404, detail=f"Unknown cache: {cache_name}")
+    return {"invalidated": cache_name, "key": key}
+
+@app.post("/admin/cache_backend/compact")
+async def compact_cache_backend_endpoint():
+    """Delete expired entries from the shared cache tier and trim each cache to its size bound."""
+    if get_cache_backend() is None:
+        raise HTTPException(status_code=404, detail="Cache backend is disabled")
+    deleted = await compact_cache_backend()
+    return {"deleted": deleted, **await backend_read(cache_backend_stats)}
+
+@app.delete("/admin/listings_cache")
+async def purge_listings_cache_endpoint(terms: Union[List[str], None] = Query(default=None)):
+    """Purge cached search results: all of them, or those of searches including any of the given terms."""
+    return {"purged": purge_listing_results(terms), "terms": terms}
 
 @app.post("/find_matching_listings")
-async def find_matching_listings_endpoint(request: ListingsRequest):
+async def find_matching_listings_endpoint(request: ListingsRequest, http_request: Request, x_request_timeout: Union[float, None] = Header(default=None), accept: Union[str, None] = Header(default=None)):
     """Search for products in Oracle Fusion catalog. Returns items with suppliers, pricing, inventory locations, and procurement details. Use this to find products for purchase requisitions or procurement analysis."""
     print(f"🔍 Received request: product_query_terms={request.product_query_terms}, limit={request.limit}")
-    try:
-        result = await find_matching_listings(
-            product_query_terms=request.product_query_terms,
-            limit=request.limit
+    stream_mode = resolve_stream_mode(request.stream, accept)
+    if stream_mode:
+        deadline_seconds = resolve_deadline(request.timeout_seconds, x_request_timeout)
+        return StreamingResponse(
+            stream_listings_response(request, deadline_seconds, stream_mode, http_request.url.path),
+            media_type=STREAM_MEDIA_TYPES[stream_mode]
         )
+    try:
+        with request_deadline(resolve_deadline(request.timeout_seconds, x_request_timeout)) as deadline:
+            result = await run_until_disconnect(http_request, find_matching_listings(
+                product_query_terms=request.product_query_terms,
+                limit=request.limit,
+                max_suppliers=request.max_suppliers,
+                max_sites=request.max_sites
+            ))
+        if deadline and deadline.exceeded:
+            print(f"⏱️ Deadline of {deadline.seconds}s exceeded, returning partial result")
+            return {"data": result, "partial": True}
         print(f"✅ Success, returning result")
         return {"data": result}
+    except ClientDisconnected:
+        return Response(status_code=499)
     except Exception as e:
         print(f"❌ Error in find_matching_listings: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/retrieve_supplier_detail")
-async def retrieve_supplier_detail_endpoint(request: SupplierDetailRequest):
+async def retrieve_supplier_detail_endpoint(request: SupplierDetailRequest, http_request: Request, x_request_timeout: Union[float, None] = Header(default=None)):
     """Get comprehensive supplier information including addresses, contacts, sites, and business unit relationships. Use this to understand supplier capabilities and delivery locations for procurement decisions."""
     try:
-        result = await retrieve_supplier_detail(
-            supplier_id=request.supplier_id,
-            bu_id=request.bu_id
-        )
+        with request_deadline(resolve_deadline(request.timeout_seconds, x_request_timeout)) as deadline:
+            result = await run_until_disconnect(http_request, retrieve_supplier_detail(
+                supplier_id=request.supplier_id,
+                bu_id=request.bu_id
+            ))
+        if deadline and deadline.exceeded:
+            return {"data": result, "partial": True}
         return {"data": result}
+    except ClientDisconnected:
+        return Response(status_code=499)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,99 @@
+import os
+from typing import Any
+
+# Ask Fusion only for the attributes the formatters read; set to false to fetch full rows when debugging
+FUSION_FIELD_PROJECTION = os.getenv("FUSION_FIELD_PROJECTION", "true").lower() in ("1", "true", "yes")
+
+# Attributes read from each Fusion resource, keyed by resource path with IDs left out.
+# Links are not attributes, so itemsV2 rows keep the self link used to find their suppliers
+PROJECTION_PROFILES: dict[str, list[str]] = {
+    "itemsV2": [
+        "ItemId", "ItemNumber", "ItemDescription", "OrganizationId", "OrganizationCode",
+        "PrimaryUOMValue", "ItemClass", "ItemStatusValue", "PurchasableFlag", "ListPrice",
+    ],
+    "itemsV2/child/ItemSupplierAssociation": ["SupplierId", "SupplierName", "AddressName"],
+    "suppliers": [
+        "SupplierId", "SupplierPartyId", "Supplier", "SupplierNumber", "Status", "BusinessRelationship",
+        "DUNSNumber", "YearEstablished", "TaxpayerCountry", "CurrentFiscalYearPotentialRevenue",
+    ],
+    "suppliers/child/sites": [
+        "SupplierSite", "ProcurementBUId", "ProcurementBU", "SitePurposePurchasingFlag",
+        "SitePurposePayFlag", "SitePurposePrimaryPayFlag", "InactiveDate",
+    ],
+    "suppliers/child/addresses": ["AddressName", "AddressLine1", "City", "State", "PostalCode", "Country"],
+    "suppliers/child/contacts": ["FirstName", "LastName", "Email", "PhoneNumber", "JobTitle"],
+    "inventoryOrganizations": [
+        "OrganizationId", "OrganizationName", "OrganizationCode", "InventoryFlag",
+        "LocationId", "ManagementBusinessUnitId",
+    ],
+}
+
+_enabled = FUSION_FIELD_PROJECTION
+_rejected: set[str] = set()
+_stats: dict[str, dict[str, dict[str, float]]] = {}
+
+def profile_name(endpoint: str) -> str:
+    """Return the projection profile key of an endpoint.
+
+    For example '/fscmRestApi/resources/11.13.18.05/suppliers/1/child/sites?q=...'
+    maps to 'suppliers/child/sites'. Unrecognised paths map to 'other'.
+    """
+    parts = [part for part in endpoint.split("?", 1)[0].split("/") if part]
+    if "resources" not in parts or parts.index("resources") + 2 >= len(parts):
+        return "other"
+    parts = parts[parts.index("resources") + 2:]
+    name = parts[0]
+    for index, part in enumerate(parts[:-1]):
+        if part == "child":
+            name += f"/child/{parts[index + 1]}"
+    return name
+
+def set_projection_enabled(enabled: bool):
+    """Turn field projection on or off at runtime. Turning it on also retries rejected profiles."""
+    global _enabled
+    _enabled = enabled
+    if enabled:
+        _rejected.clear()
+
+def reject_projection(endpoint: str):
+    """Stop projecting an endpoint's profile after Fusion rejected one of its attributes."""
+    name = profile_name(endpoint)
+    if name not in _rejected:
+        _rejected.add(name)
+        print(f"⚠️ Fusion rejected the fields= projection for '{name}', requesting full rows instead")
+
+def project(endpoint: str) -> str:
+    """Add the endpoint's fields= projection, unless disabled or the caller already chose fields."""
+    name = profile_name(endpoint)
+    fields = PROJECTION_PROFILES.get(name)
+    if not _enabled or not fields or name in _rejected or "fields=" in endpoint:
+        return endpoint
+    separator = "&" if "?" in endpoint else "?"
+    return f"{endpoint}{separator}fields={','.join(fields)}"
+
+def record_response(endpoint: str, wire_bytes: int, body_bytes: int, parse_seconds: float):
+    """Record payload size and JSON parse time of a successful response."""
+    variant = "projected" if "fields=" in endpoint else "full"
+    profile_stats = _stats.setdefault(profile_name(endpoint), {})
+    stats = profile_stats.get(variant)
+    if stats is None:
+        stats = profile_stats[variant] = {"responses": 0, "wire_bytes": 0, "body_bytes": 0, "parse_seconds": 0.0}
+    stats["responses"] += 1
+    stats["wire_bytes"] += wire_bytes
+    stats["body_bytes"] += body_bytes
+    stats["parse_seconds"] += parse_seconds
+
+def projection_stats() -> dict[str, Any]:
+    """Report average bytes on the wire, decoded body size and parse time per endpoint, with and without projection."""
+    endpoints = {}
+    for name, variants in _stats.items():
+        endpoints[name] = {
+            variant: {
+                "responses": stats["responses"],
+                "avg_wire_bytes": round(stats["wire_bytes"] / stats["responses"]),
+                "avg_body_bytes": round(stats["body_bytes"] / stats["responses"]),
+                "avg_parse_ms": round(stats["parse_seconds"] * 1000 / stats["responses"], 3),
+            }
+            for variant, stats in variants.items()
+        }
+    return {"enabled": _enabled, "rejected_profiles": sorted(_rejected), "endpoints": endpoints}
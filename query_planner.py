@@ -0,0 +1,118 @@
+import os
+from typing import Any
+
+# Case of item numbers in the Fusion item master: "mixed" searches the original, lower
+# and upper case form of every term; "upper" or "lower" searches that form only
+ITEM_NUMBER_CASE = os.getenv("ITEM_NUMBER_CASE", "mixed").lower()
+
+# Characters with a special meaning in a LIKE pattern
+LIKE_WILDCARDS = ("%", "_")
+
+_stats = {"searches": 0, "naive_queries": 0, "issued_queries": 0, "followup_queries": 0, "cancelled_queries": 0}
+
+class QueryPlan:
+    """The minimal set of ItemNumber prefix queries covering a list of search terms.
+
+    ``prefixes`` lists every per-term case variant in the order the naive strategy
+    would query them. ``queries`` is the subset actually sent to Fusion, and
+    ``covered_by`` maps each prefix to the query whose results contain its matches.
+    """
+
+    def __init__(self, prefixes: list[str], covered_by: dict[str, str], naive_queries: int):
+        self.prefixes = prefixes
+        self.covered_by = covered_by
+        self.queries = [prefix for prefix in prefixes if covered_by[prefix] == prefix]
+        self.naive_queries = naive_queries
+
+def normalize_terms(terms: list[str]) -> list[str]:
+    """Strip whitespace and drop blank and duplicate terms, keeping their order."""
+    normalized = list(dict.fromkeys(term.strip() for term in terms))
+    non_blank = [term for term in normalized if term]
+    return non_blank or normalized[:1]
+
+def case_variants(term: str) -> list[str]:
+    """Return the distinct case forms of a term to search for."""
+    if ITEM_NUMBER_CASE == "upper":
+        return [term.upper()]
+    if ITEM_NUMBER_CASE == "lower":
+        return [term.lower()]
+    return list(dict.fromkeys([term, term.lower(), term.upper()]))
+
+def canonical_terms(terms) -> tuple[str, ...]:
+    """Return the sorted, distinct case variants a search for these terms looks up.
+
+    Two searches whose terms differ only in order, whitespace or duplicates, or in
+    case where ITEM_NUMBER_CASE makes the lookups identical ("brake" and "BRAKE"),
+    map to the same tuple.
+    """
+    if isinstance(terms, str):
+        terms = [terms]
+    return tuple(sorted({variant for term in normalize_terms(terms) for variant in case_variants(term)}))
+
+def _has_wildcards(prefix: str) -> bool:
+    return any(wildcard in prefix for wildcard in LIKE_WILDCARDS)
+
+def plan_item_queries(terms: list[str]) -> QueryPlan:
+    """Plan the ItemNumber LIKE queries for a set of search terms.
+
+    A prefix is dropped when a shorter planned prefix already covers it, since
+    "brake%" matches everything "brake pad%" does. Prefixes containing LIKE
+    wildcards are always queried on their own.
+    """
+    naive_queries = sum(len(case_variants(term)) for term in terms)
+    prefixes = list(dict.fromkeys(
+        variant for term in normalize_terms(terms) for variant in case_variants(term)
+    ))
+
+    # Shortest first, so every prefix is compared against the broadest candidates
+    covering = []
+    covered_by = {}
+    for prefix in sorted(prefixes, key=len):
+        cover = None
+        if not _has_wildcards(prefix):
+            cover = next((c for c in covering if prefix.startswith(c)), None)
+        if cover is None:
+            if not _has_wildcards(prefix):
+                covering.append(prefix)
+            cover = prefix
+        covered_by[prefix] = cover
+
+    plan = QueryPlan(prefixes, covered_by, naive_queries)
+    _stats["searches"] += 1
+    _stats["naive_queries"] += naive_queries
+    _stats["issued_queries"] += len(plan.queries)
+    return plan
+
+def items_with_prefix(data: dict | None, prefix: str, limit: int) -> dict | None:
+    """Filter a covering query's response down to the items one prefix query would return."""
+    if not data or "error" in data:
+        return data
+    items = [item for item in data.get("items", []) if str(item.get("ItemNumber") or "").startswith(prefix)]
+    return {"items": items[:limit]}
+
+def is_truncated(data: dict | None, limit: int) -> bool:
+    """Return True if a query hit its limit, so prefixes it covers may be missing matches."""
+    if not data or "error" in data:
+        return False
+    return bool(data.get("hasMore", len(data.get("items", [])) >= limit))
+
+def record_followup_queries(count: int):
+    """Count prefix queries that had to be sent because their covering query was truncated."""
+    _stats["issued_queries"] += count
+    _stats["followup_queries"] += count
+
+def record_cancelled_queries(count: int):
+    """Count queries cancelled because the search had already collected enough results."""
+    _stats["cancelled_queries"] += count
+
+def query_planner_stats() -> dict[str, Any]:
+    """Report how many itemsV2 queries the planner saved compared to one query per term variant."""
+    return {
+        "item_number_case": ITEM_NUMBER_CASE,
+        "searches": _stats["searches"],
+        "naive_queries": _stats["naive_queries"],
+        "issued_queries": _stats["issued_queries"],
+        "followup_queries": _stats["followup_queries"],
+        "cancelled_queries": _stats["cancelled_queries"],
+        "queries_saved": _stats["naive_queries"] - _stats["issued_queries"],
+    }
@@ -0,0 +1,242 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable
+
+import httpx
+
+# Retry configuration (idempotent GETs only)
+FUSION_MAX_RETRIES = int(os.getenv("FUSION_MAX_RETRIES", "2"))
+FUSION_RETRY_BASE_DELAY = float(os.getenv("FUSION_RETRY_BASE_DELAY", "0.2"))
+FUSION_RETRY_MAX_DELAY = float(os.getenv("FUSION_RETRY_MAX_DELAY", "5.0"))
+
+# Hedged request configuration
+FUSION_HEDGE_REQUESTS = os.getenv("FUSION_HEDGE_REQUESTS", "false").lower() in ("1", "true", "yes")
+FUSION_HEDGE_MIN_SAMPLES = int(os.getenv("FUSION_HEDGE_MIN_SAMPLES", "20"))
+
+# Circuit breaker configuration
+FUSION_CIRCUIT_BREAKERS = os.getenv("FUSION_CIRCUIT_BREAKERS", "true").lower() in ("1", "true", "yes")
+FUSION_BREAKER_FAILURE_THRESHOLD = int(os.getenv("FUSION_BREAKER_FAILURE_THRESHOLD", "5"))
+FUSION_BREAKER_RECOVERY_TIMEOUT = float(os.getenv("FUSION_BREAKER_RECOVERY_TIMEOUT", "30"))
+
+RETRYABLE_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """Per-resource circuit breaker.
+
+    Opens after ``failure_threshold`` consecutive failed requests, rejects calls
+    while open, and after ``recovery_timeout`` seconds lets a single probe
+    through (half-open). A successful probe closes the breaker, a failed one
+    opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.rejected = 0
+        self.times_opened = 0
+
+    def allow(self) -> bool:
+        """Return True if a request may be sent now."""
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+            self.state = HALF_OPEN
+            self.probe_in_flight = False
+
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.times_opened += 1
+                print(f"⚡ Circuit breaker for '{self.name}' opened after {self.consecutive_failures} consecutive failures")
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+
+    def release_probe(self):
+        """Release a half-open probe whose request ended without telling whether the resource is healthy,
+        such as a cancelled request or a client-side error."""
+        self.probe_in_flight = False
+
+    def stats(self) -> dict[str, Any]:
+        stats = {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
+        if self.state == OPEN:
+            stats["retry_in_seconds"] = round(max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at)), 1)
+        return stats
+
+class LatencyTracker:
+    """Rolling window of call latencies for one resource, used to pick the hedge delay."""
+
+    def __init__(self, size: int = 200):
+        self.samples: deque[float] = deque(maxlen=size)
+        self._p95 = None
+        self._new_samples = 0
+
+    def record(self, latency: float):
+        self.samples.append(latency)
+        self._new_samples += 1
+
+    def p95(self) -> float | None:
+        """Return the 95th percentile latency, or None until enough samples were seen."""
+        if len(self.samples) < FUSION_HEDGE_MIN_SAMPLES:
+            return None
+        # Re-sorting on every call would dominate for hot resources, so refresh periodically
+        if self._p95 is None or self._new_samples >= 20:
+            ordered = sorted(self.samples)
+            self._p95 = ordered[int(len(ordered) * 0.95) - 1]
+            self._new_samples = 0
+        return self._p95
+
+_latencies: dict[str, LatencyTracker] = {}
+_breakers: dict[str, CircuitBreaker] = {}
+_counts = {"retries": {}, "hedges_sent": 0, "hedge_wins": 0}
+
+def _tracker(resource: str) -> LatencyTracker:
+    tracker = _latencies.get(resource)
+    if tracker is None:
+        tracker = _latencies[resource] = LatencyTracker()
+    return tracker
+
+def circuit_breaker(resource: str) -> CircuitBreaker | None:
+    """Return the circuit breaker for a resource, or None when breakers are disabled."""
+    if not FUSION_CIRCUIT_BREAKERS:
+        return None
+    breaker = _breakers.get(resource)
+    if breaker is None:
+        breaker = _breakers[resource] = CircuitBreaker(resource, FUSION_BREAKER_FAILURE_THRESHOLD, FUSION_BREAKER_RECOVERY_TIMEOUT)
+    return breaker
+
+def breaker_stats() -> dict[str, Any]:
+    """Report the state of every circuit breaker that has seen traffic."""
+    return {resource: breaker.stats() for resource, breaker in _breakers.items()}
+
+def retry_after_seconds(response: httpx.Response) -> float | None:
+    """Parse a Retry-After header given either in seconds or as an HTTP date."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given zero-based attempt."""
+    return random.uniform(0, min(FUSION_RETRY_MAX_DELAY, FUSION_RETRY_BASE_DELAY * (2 ** attempt)))
+
+async def _timed(resource: str, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+    started = time.monotonic()
+    response = await send()
+    _tracker(resource).record(time.monotonic() - started)
+    return response
+
+async def send_hedged(resource: str, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+    """Send a request, firing a duplicate if it is still running after the resource's p95 latency.
+
+    Whichever copy answers first wins and the other is cancelled.
+    """
+    hedge_delay = _tracker(resource).p95() if FUSION_HEDGE_REQUESTS else None
+    if hedge_delay is None:
+        return await _timed(resource, send)
+
+    primary = asyncio.ensure_future(_timed(resource, send))
+    hedge = None
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+        if done:
+            return primary.result()
+
+        hedge = asyncio.ensure_future(_timed(resource, send))
+        _counts["hedges_sent"] += 1
+        pending = {primary, hedge}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        _counts["hedge_wins"] += 1
+                    return task.result()
+        # Both copies failed, surface the primary's error
+        return primary.result()
+    finally:
+        for task in (primary, hedge):
+            if task is not None and not task.done():
+                task.cancel()
+
+async def send_idempotent(resource: str, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+    """Send an idempotent request, retrying transient failures with jittered exponential backoff.
+
+    Retries cover transport errors and retryable status codes. A Retry-After
+    header is honoured; if it asks for a longer wait than FUSION_RETRY_MAX_DELAY
+    the response is returned as-is instead of retrying early.
+
+    Never use this for non-idempotent writes such as purchaseRequisitions POSTs.
+    """
+    for attempt in range(FUSION_MAX_RETRIES + 1):
+        last_attempt = attempt == FUSION_MAX_RETRIES
+        try:
+            response = await send_hedged(resource, send)
+        except httpx.TransportError:
+            if last_attempt:
+                raise
+            delay = backoff_delay(attempt)
+        else:
+            if response.status_code not in RETRYABLE_STATUS_CODES or last_attempt:
+                return response
+            delay = retry_after_seconds(response)
+            if delay is None:
+                delay = backoff_delay(attempt)
+            elif delay > FUSION_RETRY_MAX_DELAY:
+                return response
+
+        _counts["retries"][resource] = _counts["retries"].get(resource, 0) + 1
+        await asyncio.sleep(delay)
+
+def resilience_stats() -> dict[str, Any]:
+    """Report retries per resource, hedging counters and the observed p95 latencies."""
+    return {
+        "retries": dict(_counts["retries"]),
+        "hedging_enabled": FUSION_HEDGE_REQUESTS,
+        "hedges_sent": _counts["hedges_sent"],
+        "hedge_wins": _counts["hedge_wins"],
+        "p95_latency_ms": {
+            resource: round(tracker.p95() * 1000, 2)
+            for resource, tracker in _latencies.items()
+            if tracker.p95() is not None
+        },
+    }
@@ -1,7 +1,20 @@
 from typing import Any
+import asyncio
 import httpx
 import os
+import time
 from pathlib import Path
+from fusion_http import get_client, pool_name, resource_name, coalesce, FUSION_TIMEOUT, FUSION_COALESCE_GETS
+from concurrency import upstream_slot
+from resilience import send_idempotent, circuit_breaker, RETRYABLE_STATUS_CODES
+from deadline import current_deadline
+from query_planner import plan_item_queries, canonical_terms, items_with_prefix, is_truncated, record_followup_queries, record_cancelled_queries
+from cache import TTLCache
+from cache_backend import JsonCodec
+from dataloader import load, request_scoped, FUSION_BATCH_QUERIES
+from fusion_query import fusion_query, eq, like_prefix, in_filter
+from projections import project, record_response, reject_projection
+from entities import EntityGraph, BusinessUnitOrgs, InventoryOrg, ItemSupplier
 
 try:
     from dotenv import load_dotenv
@@ -47,8 +60,87 @@ PURCHASE_REQUISITIONS_ENDPOINT = f"{FSCM_API_BASE}/purchaseRequisitions"
 INVENTORY_ORGS_ENDPOINT = f"{FSCM_API_BASE}/inventoryOrganizations"
 WORKERS_ENDPOINT = f"{HCM_API_BASE}/workers"
 
+# Cache configuration (seconds)
+USER_BU_CACHE_TTL = float(os.getenv("USER_BU_CACHE_TTL", "3600"))
+REFERENCE_CACHE_TTL = float(os.getenv("REFERENCE_CACHE_TTL", "21600"))
+REFERENCE_CACHE_STALE_TTL = float(os.getenv("REFERENCE_CACHE_STALE_TTL", "86400"))
+REFERENCE_CACHE_MAX_SIZE = int(os.getenv("REFERENCE_CACHE_MAX_SIZE", "2048"))
+SUPPLIER_ID_CACHE_TTL = float(os.getenv("SUPPLIER_ID_CACHE_TTL", "86400"))
+SUPPLIER_ID_NEGATIVE_TTL = float(os.getenv("SUPPLIER_ID_NEGATIVE_TTL", "300"))
+SUPPLIER_ID_CACHE_MAX_SIZE = int(os.getenv("SUPPLIER_ID_CACHE_MAX_SIZE", "10000"))
+LISTINGS_CACHE_TTL = float(os.getenv("LISTINGS_CACHE_TTL", "120"))
+LISTINGS_CACHE_MAX_SIZE = int(os.getenv("LISTINGS_CACHE_MAX_SIZE", "512"))
+
+# Suppliers per item organization and sites per supplier shown in listings, unless the caller asks for more
+DEFAULT_MAX_SUPPLIERS = 2
+DEFAULT_MAX_SITES = 2
+# Sites per supplier whose business units are searched for an item's organization, when no site matches
+# the association's address; an organization is only listed if one of them knows it as an inventory org
+LOOKUP_SITES_PER_SUPPLIER = 3
+
+# Addresses and sites shown in a supplier detail
+DETAIL_MAX_ADDRESSES = 35
+DETAIL_MAX_SITES = 5
+
+# Reference data caches are persisted to the shared cache backend (CACHE_BACKEND), so they survive
+# restarts and every worker on the host uses them
+user_business_units_cache = TTLCache("user_business_units", ttl=USER_BU_CACHE_TTL, persist=JsonCodec())
+bu_delivery_locations_cache = TTLCache("bu_delivery_locations", ttl=REFERENCE_CACHE_TTL, max_size=REFERENCE_CACHE_MAX_SIZE, stale_ttl=REFERENCE_CACHE_STALE_TTL,
+                                       persist=JsonCodec(BusinessUnitOrgs.to_json, BusinessUnitOrgs.from_json))
+org_location_cache = TTLCache("org_locations", ttl=REFERENCE_CACHE_TTL, max_size=REFERENCE_CACHE_MAX_SIZE, stale_ttl=REFERENCE_CACHE_STALE_TTL, persist=JsonCodec())
+supplier_id_cache = TTLCache("supplier_ids", ttl=SUPPLIER_ID_CACHE_TTL, max_size=SUPPLIER_ID_CACHE_MAX_SIZE, negative_ttl=SUPPLIER_ID_NEGATIVE_TTL, persist=JsonCodec())
+# Whole find_matching_listings results; never refreshed in the background, a search is only rerun when asked again
+listing_results_cache = TTLCache("listing_results", ttl=LISTINGS_CACHE_TTL, max_size=LISTINGS_CACHE_MAX_SIZE, refresh_ahead=1.0)
+
 async def make_fusion_request(endpoint: str, method: str = "GET", data: dict = None, use_write_auth: bool = False) -> dict[str, Any] | None:
-    """Make a request to the Oracle Fusion API with proper error handling."""
+    """Make a request to the Oracle Fusion API with proper error handling.
+    
+    Identical GETs already in flight for the same auth identity share a single
+    upstream call and its result. Inside a request_deadline() block the call is
+    bounded by the remaining budget and returns an error dict with
+    "deadline_exceeded" once it runs out.
+    """
+    # Stop issuing upstream calls once the API request's time budget is spent
+    deadline = current_deadline()
+    if deadline and deadline.remaining() <= 0:
+        deadline.exceeded = True
+        return {"error": "Request deadline exceeded", "status_code": None, "deadline_exceeded": True}
+    
+    # Only request the attributes the formatters read
+    full_endpoint = endpoint
+    if method.upper() == "GET":
+        endpoint = project(endpoint)
+    
+    async def send():
+        result = await _send_fusion_request(endpoint, method, data, use_write_auth)
+        if endpoint != full_endpoint and result and result.get("status_code") == 400:
+            # A 400 may also come from the filter itself (a bad search term, an oversized in (...)), so the
+            # profile is only blamed when the same request without fields= succeeds
+            full_result = await _send_fusion_request(full_endpoint, method, data, use_write_auth)
+            if full_result and "error" not in full_result:
+                # This instance does not know an attribute of the profile, fall back to full rows from now on
+                reject_projection(full_endpoint)
+                return full_result
+        return result
+    
+    if method.upper() == "GET" and FUSION_COALESCE_GETS:
+        key = (f"{FUSION_API_BASE}{endpoint}", pool_name(use_write_auth))
+        request = coalesce(key, send)
+    else:
+        request = send()
+    
+    if not deadline:
+        return await request
+    
+    # The remaining budget bounds queueing, retries and the call itself
+    try:
+        return await asyncio.wait_for(request, deadline.remaining())
+    except asyncio.TimeoutError:
+        deadline.exceeded = True
+        return {"error": "Request deadline exceeded", "status_code": None, "deadline_exceeded": True}
+
+async def _send_fusion_request(endpoint: str, method: str, data: dict, use_write_auth: bool) -> dict[str, Any] | None:
+    """Send a single request to the Oracle Fusion API over the pooled client."""
     auth_header = FUSION_AUTH_WRITE if use_write_auth else FUSION_AUTH_READ
     
     headers = {
@@ -59,59 +151,102 @@ async def make_fusion_request(endpoint: str, method: str = "GET", data: dict = N
     }
     
     url = f"{FUSION_API_BASE}{endpoint}"
+    client = get_client(use_write_auth)
+    resource = resource_name(endpoint)
     
-    async with httpx.AsyncClient() as client:
-        try:
+    if method.upper() not in ("GET", "POST", "PUT", "DELETE"):
+        return None
+    
+    async def send_once() -> httpx.Response:
+        # Bounded per resource and by an adaptive global limit so one broad search cannot flood the pod
+        async with upstream_slot(resource) as call:
             if method.upper() == "GET":
-                response = await client.get(url, headers=headers, timeout=30.0)
+                response = await client.get(url, headers=headers, timeout=FUSION_TIMEOUT)
             elif method.upper() == "POST":
-                response = await client.post(url, headers=headers, json=data, timeout=30.0)
+                response = await client.post(url, headers=headers, json=data, timeout=FUSION_TIMEOUT)
             elif method.upper() == "PUT":
-                response = await client.put(url, headers=headers, json=data, timeout=30.0)
-            elif method.upper() == "DELETE":
-                response = await client.delete(url, headers=headers, timeout=30.0)
+                response = await client.put(url, headers=headers, json=data, timeout=FUSION_TIMEOUT)
             else:
-                return None
-                
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPStatusError as e:
-            # Generate curl command for debugging
-            curl_cmd = f"curl -X {method.upper()} \\\n"
-            curl_cmd += f"  '{url}' \\\n"
-            for key, value in headers.items():
-                curl_cmd += f"  -H '{key}: {value}' \\\n"
-            if data and method.upper() in ["POST", "PUT"]:
-                import json
-                curl_cmd += f"  -d '{json.dumps(data, separators=(',', ':'))}'"
+                response = await client.delete(url, headers=headers, timeout=FUSION_TIMEOUT)
+            call.status_code = response.status_code
+            return response
+    
+    # Fail fast while the resource is known to be degraded instead of waiting out the timeout
+    breaker = circuit_breaker(resource)
+    if breaker and not breaker.allow():
+        return {"error": f"Circuit breaker open for Fusion resource '{resource}'", "status_code": None, "circuit_open": True}
+    
+    try:
+        if method.upper() == "GET":
+            # Only idempotent reads are retried and hedged; writes such as requisition POSTs are sent exactly once
+            response = await send_idempotent(resource, send_once)
+        else:
+            response = await send_once()
+        
+        if breaker:
+            if response.status_code in RETRYABLE_STATUS_CODES:
+                breaker.record_failure()
             else:
-                curl_cmd = curl_cmd.rstrip(' \\\n')
-            
-            print(f"\n🚨 HTTP Error - Debug with this curl command:")
-            print(f"{curl_cmd}\n")
+                breaker.record_success()
             
-            try:
-                error_details = e.response.json()
-                error_message = f"HTTP {e.response.status_code}: {error_details}"
-                return {"error": error_message, "status_code": e.response.status_code}
-            except:
-                return {"error": f"HTTP {e.response.status_code}: {e.response.text}", "status_code": e.response.status_code}
-        except Exception as e:
-            return {"error": str(e), "status_code": None}
-
-async def get_user_business_units() -> list[str]:
-    """Get the business unit IDs that the user has access to from HCM API.
+        response.raise_for_status()
+        parse_started = time.perf_counter()
+        payload = response.json()
+        if method.upper() == "GET":
+            # num_bytes_downloaded is the compressed size as received, 0 for transports that do not stream
+            record_response(endpoint, response.num_bytes_downloaded or len(response.content), len(response.content), time.perf_counter() - parse_started)
+        return payload
+    except httpx.HTTPStatusError as e:
+        # Generate curl command for debugging
+        curl_cmd = f"curl -X {method.upper()} \\\n"
+        curl_cmd += f"  '{url}' \\\n"
+        for key, value in headers.items():
+            curl_cmd += f"  -H '{key}: {value}' \\\n"
+        if data and method.upper() in ["POST", "PUT"]:
+            import json
+            curl_cmd += f"  -d '{json.dumps(data, separators=(',', ':'))}'"
+        else:
+            curl_cmd = curl_cmd.rstrip(' \\\n')
+        
+        print(f"\n🚨 HTTP Error - Debug with this curl command:")
+        print(f"{curl_cmd}\n")
+        
+        try:
+            error_details = e.response.json()
+            error_message = f"HTTP {e.response.status_code}: {error_details}"
+            return {"error": error_message, "status_code": e.response.status_code}
+        except:
+            return {"error": f"HTTP {e.response.status_code}: {e.response.text}", "status_code": e.response.status_code}
+    except asyncio.CancelledError:
+        if breaker:
+            breaker.release_probe()
+        raise
+    except Exception as e:
+        if breaker:
+            if isinstance(e, httpx.TransportError):
+                breaker.record_failure()
+            else:
+                breaker.release_probe()
+        return {"error": str(e), "status_code": None}
+
+async def fetch_user_business_units(user_id: str) -> list[str] | None:
+    """Fetch the business unit IDs assigned to a user from the HCM workers API.
     
+    Args:
+        user_id: The HCM PersonId of the user
+        
     Returns:
-        List of business unit IDs as strings.
+        List of business unit IDs as strings, or None if the lookup failed.
     """
     try:
-        user_id = FUSION_USER_ID
-        endpoint = f"{WORKERS_ENDPOINT}?q=PersonId={user_id}&expand=workRelationships.assignments"
+        endpoint = fusion_query(WORKERS_ENDPOINT, q=[eq("PersonId", user_id)], expand="workRelationships.assignments", only_data=True)
         
         worker_data = await make_fusion_request(endpoint, use_write_auth=True)
         
-        if not worker_data or not worker_data.get('items'):
+        if not worker_data or "error" in worker_data:
+            return None
+        
+        if not worker_data.get('items'):
             return []
         
         business_unit_ids = set()
@@ -128,85 +263,313 @@ async def get_user_business_units() -> list[str]:
         return list(business_unit_ids)
         
     except Exception as e:
-        return []
+        return None
+
+async def get_user_business_units(user_id: str = None) -> list[str]:
+    """Get the business unit IDs that the user has access to from HCM API.
+    
+    Results are cached per user for USER_BU_CACHE_TTL seconds and refreshed in
+    the background before they expire.
+    
+    Args:
+        user_id: Optional HCM PersonId, defaults to FUSION_USER_ID
+        
+    Returns:
+        List of business unit IDs as strings.
+    """
+    user_id = str(user_id or FUSION_USER_ID)
+    business_unit_ids = await user_business_units_cache.get_or_load(
+        user_id, lambda: fetch_user_business_units(user_id)
+    )
+    return list(business_unit_ids) if business_unit_ids else []
+
+def invalidate_user_business_units(user_id: str = None):
+    """Drop cached business units for one user, or for every user when no ID is given."""
+    user_business_units_cache.invalidate(str(user_id) if user_id else None)
+
+async def fetch_business_unit_inventory_orgs(bu_id: str) -> list | None:
+    """Fetch the inventory organizations managed by a business unit.
+    
+    Returns:
+        List of inventory organizations, or None if the lookup failed.
+    """
+    # Only inventory-enabled organizations are ever shown or used as destinations
+    inv_endpoint = fusion_query(
+        INVENTORY_ORGS_ENDPOINT,
+        q=[eq("ManagementBusinessUnitId", bu_id)],
+        filters=[eq("InventoryFlag", "true")],
+        only_data=True
+    )
+    inv_data = await make_fusion_request(inv_endpoint)
+    
+    if not inv_data or "error" in inv_data:
+        return None
+    
+    return inv_data.get("items") or []
+
+async def fetch_each(keys: list, fetch) -> dict:
+    """Fetch every key on its own, in parallel, as a batch loader result."""
+    values = await asyncio.gather(*[fetch(key) for key in keys])
+    return dict(zip(keys, values))
+
+async def fetch_business_unit_inventory_orgs_batch(bu_ids: list) -> dict:
+    """Fetch the inventory organizations of several business units with one query.
+    
+    Falls back to one query per business unit if the combined query fails or is truncated.
+    
+    Returns:
+        Dictionary mapping each business unit ID to its inventory organizations, or None if the lookup failed.
+    """
+    if len(bu_ids) == 1 or not FUSION_BATCH_QUERIES:
+        return await fetch_each(bu_ids, fetch_business_unit_inventory_orgs)
+    
+    inv_endpoint = fusion_query(
+        INVENTORY_ORGS_ENDPOINT,
+        q=[in_filter("ManagementBusinessUnitId", bu_ids)],
+        filters=[eq("InventoryFlag", "true")],
+        limit=500,
+        only_data=True
+    )
+    inv_data = await make_fusion_request(inv_endpoint)
+    
+    orgs = inv_data.get("items") if inv_data and "error" not in inv_data else None
+    if orgs is None or inv_data.get("hasMore") or any(org.get('ManagementBusinessUnitId') is None for org in orgs):
+        return await fetch_each(bu_ids, fetch_business_unit_inventory_orgs)
+    
+    orgs_by_bu = {str(bu_id): [] for bu_id in bu_ids}
+    for org in orgs:
+        orgs_by_bu.setdefault(str(org.get('ManagementBusinessUnitId')), []).append(org)
+    return {bu_id: orgs_by_bu[str(bu_id)] for bu_id in bu_ids}
+
+async def fetch_inventory_org_location(org_id: str) -> dict | None:
+    """Fetch the deliver-to location of an inventory organization from its detail resource.
+    
+    Used for organizations whose list row has no LocationId; querying the list
+    collection again would return the same row, so there is no batched variant.
+    
+    Returns:
+        Dictionary with the organization's LocationId, or None if the lookup failed.
+    """
+    detail_endpoint = fusion_query(f"{INVENTORY_ORGS_ENDPOINT}/{org_id}", only_data=True)
+    org_detail = await make_fusion_request(detail_endpoint)
+    
+    if not org_detail or "error" in org_detail:
+        return None
+    
+    return {"LocationId": org_detail.get('LocationId')}
+
+async def fetch_business_unit_delivery_locations(bu_id: str) -> BusinessUnitOrgs | None:
+    """Build a business unit's deliver-to map: its inventory organizations with their LocationId.
+    
+    LocationId is read from the organization list rows, so a business unit costs a
+    single (batched) list query. Only inventory-enabled organizations whose row has
+    no LocationId are fetched from their detail resource, through the org location cache.
+    
+    Returns:
+        The business unit's indexed organizations, or None if the organization list
+        or any of the location lookups failed.
+    """
+    orgs = await load("bu_inventory_orgs", bu_id, fetch_business_unit_inventory_orgs_batch)
+    if orgs is None:
+        return None
+    
+    missing = [org.get('OrganizationId') for org in orgs
+               if org.get('InventoryFlag') and org.get('OrganizationId') and org.get('LocationId') is None]
+    looked_up = {}
+    if missing:
+        location_results = await asyncio.gather(*[
+            org_location_cache.get_or_load(str(org_id), lambda org_id=org_id: fetch_inventory_org_location(org_id))
+            for org_id in missing
+        ])
+        # A failed lookup would be cached as "no location" for REFERENCE_CACHE_TTL; fail the business unit instead
+        if any(org_location is None for org_location in location_results):
+            return None
+        looked_up = {org_id: org_location.get('LocationId') for org_id, org_location in zip(missing, location_results)}
+    
+    return BusinessUnitOrgs(tuple(
+        InventoryOrg.from_fusion(org, org.get('LocationId') if org.get('LocationId') is not None else looked_up.get(org.get('OrganizationId')))
+        for org in orgs
+    ))
+
+async def get_business_unit_delivery_locations(bu_ids, failed: list = None) -> dict:
+    """Get the deliver-to map of each business unit, served from the reference data cache.
+    
+    Args:
+        bu_ids: Iterable of business unit IDs
+        failed: Optional list that receives the IDs of business units whose lookup failed
+        
+    Returns:
+        Dictionary mapping each business unit ID to its BusinessUnitOrgs.
+        Business units without organizations, or whose lookup failed, are left out.
+    """
+    bu_id_list = list(bu_ids)
+    results = await asyncio.gather(*[
+        bu_delivery_locations_cache.get_or_load(str(bu_id), lambda bu_id=bu_id: fetch_business_unit_delivery_locations(bu_id))
+        for bu_id in bu_id_list
+    ])
+    
+    if failed is not None:
+        failed.extend(bu_id for bu_id, orgs in zip(bu_id_list, results) if orgs is None)
+    return {bu_id: orgs for bu_id, orgs in zip(bu_id_list, results) if orgs and orgs.orgs}
+
+async def fetch_supplier_ids(supplier_party_id: str) -> dict | None:
+    """Search a supplier by its public SupplierPartyId to find the internal SupplierId.
+    
+    Returns:
+        Dictionary with SupplierId and SupplierPartyId, an empty dictionary if no
+        supplier matches, or None if the lookup failed.
+    """
+    # Oracle supplier flow: SupplierPartyId (public ID) → search → SupplierId (internal ID for child endpoints)
+    search_endpoint = fusion_query(SUPPLIERS_ENDPOINT, q=[eq("SupplierPartyId", supplier_party_id, quote=True)], limit=1, only_data=True)
+    search_data = await make_fusion_request(search_endpoint)
+    
+    if not search_data or "error" in search_data:
+        return None
+    
+    if not search_data.get('items'):
+        return {}
+    
+    supplier_details = search_data['items'][0]
+    return {
+        "SupplierId": supplier_details.get('SupplierId'),
+        "SupplierPartyId": supplier_details.get('SupplierPartyId')
+    }
+
+async def fetch_supplier_ids_batch(supplier_party_ids: list) -> dict:
+    """Resolve several SupplierPartyIds with one supplier search.
+    
+    Falls back to one search per supplier if the combined search fails or is truncated.
+    
+    Returns:
+        Dictionary mapping each SupplierPartyId to what fetch_supplier_ids would return for it.
+    """
+    if len(supplier_party_ids) == 1 or not FUSION_BATCH_QUERIES:
+        return await fetch_each(supplier_party_ids, fetch_supplier_ids)
+    
+    search_endpoint = fusion_query(
+        SUPPLIERS_ENDPOINT,
+        q=[in_filter("SupplierPartyId", supplier_party_ids, quote=True)],
+        limit=len(supplier_party_ids),
+        only_data=True
+    )
+    search_data = await make_fusion_request(search_endpoint)
+    
+    if not search_data or "error" in search_data or search_data.get("hasMore"):
+        return await fetch_each(supplier_party_ids, fetch_supplier_ids)
+    
+    found = {}
+    for supplier_details in search_data.get("items", []):
+        found.setdefault(str(supplier_details.get('SupplierPartyId')), {
+            "SupplierId": supplier_details.get('SupplierId'),
+            "SupplierPartyId": supplier_details.get('SupplierPartyId')
+        })
+    return {supplier_party_id: found.get(str(supplier_party_id), {}) for supplier_party_id in supplier_party_ids}
+
+async def fetch_supplier_sites(supplier_id: str, bu_ids: list = None) -> list | None:
+    """Fetch the sites of a supplier by its internal SupplierId.
+    
+    Args:
+        supplier_id: The internal SupplierId
+        bu_ids: Optional procurement business unit IDs to restrict the sites to
+        
+    Returns:
+        List of supplier sites, or None if the lookup failed.
+    """
+    sites_endpoint = fusion_query(
+        f"{SUPPLIERS_ENDPOINT}/{supplier_id}/child/sites",
+        filters=[in_filter("ProcurementBUId", bu_ids)] if bu_ids else None,
+        only_data=True
+    )
+    sites_data = await make_fusion_request(sites_endpoint)
+    
+    if not sites_data or "error" in sites_data:
+        return None
+    
+    return sites_data.get("items") or []
+
+async def resolve_supplier_ids(supplier_party_id: str) -> dict:
+    """Resolve a SupplierPartyId to its internal SupplierId, served from the ID mapping cache.
+    
+    Unknown IDs are cached as negative entries for SUPPLIER_ID_NEGATIVE_TTL seconds.
+    
+    Returns:
+        Dictionary with SupplierId and SupplierPartyId, an empty dictionary if no
+        supplier matches, or None if the lookup failed.
+    """
+    return await supplier_id_cache.get_or_load(
+        str(supplier_party_id), lambda: load("supplier_ids", str(supplier_party_id), fetch_supplier_ids_batch)
+    )
 
-async def enrich_sites_with_inventory_info(sites: list) -> list:
-    """Enrich sites with inventory organizations and delivery location information.
+async def load_site_business_units(sites, graph: EntityGraph):
+    """Add the inventory organizations of each site's business unit to the graph.
+    
+    Sites only keep their ProcurementBUId; the formatter looks the business unit
+    up in the graph, so its organizations are held once however many sites share it.
     
     Args:
-        sites: List of supplier sites
+        sites: SupplierSite entities
+        graph: The search's entity graph
         
     Returns:
-        List of enriched sites with inventory organizations and delivery locations
+        IDs of the business units whose lookup failed.
+    """
+    bu_ids = {site.procurement_bu_id for site in sites
+              if site.procurement_bu_id and graph.business_unit(site.procurement_bu_id) is None}
+    if not bu_ids:
+        return []
+    
+    failed = []
+    business_units = await get_business_unit_delivery_locations(bu_ids, failed)
+    for bu_id, orgs in business_units.items():
+        graph.add_business_unit(bu_id, orgs)
+    return failed
+
+def find_item_organization(org_key: str, suppliers: list, graph: EntityGraph) -> tuple[bool, str | None]:
+    """Look an item's organization up in the business units of its suppliers' sites.
+    
+    Sites are searched in order, until one whose business unit knows the organization by name.
+    
+    Returns:
+        Whether the organization was found as an inventory organization, and its name
+        (None while no site has decided it).
     """
-    if not sites:
-        return sites
-        
-    bu_groups = {}
-    for site in sites:
-        bu_id = site.get('ProcurementBUId')
-        if bu_id:
-            if bu_id not in bu_groups:
-                bu_groups[bu_id] = []
-            bu_groups[bu_id].append(site)
-    
-    import asyncio
-    inv_tasks = []
-    bu_id_list = list(bu_groups.keys())
-    
-    for bu_id in bu_id_list:
-        inv_endpoint = f"{INVENTORY_ORGS_ENDPOINT}?q=ManagementBusinessUnitId={bu_id}"
-        inv_tasks.append(make_fusion_request(inv_endpoint))
-    
-    inventory_orgs = {}
-    if inv_tasks:
-        inv_results = await asyncio.gather(*inv_tasks)
-        for i, inv_data in enumerate(inv_results):
-            if inv_data and inv_data.get("items"):
-                inventory_orgs[bu_id_list[i]] = inv_data["items"]
-    
-    location_tasks = []
-    org_ids = []
-    
-    for bu_id, orgs in inventory_orgs.items():
-        for org in orgs:
-            if org.get('InventoryFlag'):
-                org_id = org.get('OrganizationId')
-                if org_id:
-                    detail_endpoint = f"{INVENTORY_ORGS_ENDPOINT}/{org_id}"
-                    location_tasks.append(make_fusion_request(detail_endpoint))
-                    org_ids.append(org_id)
-    
-    inventory_locations = {}
-    if location_tasks:
-        location_results = await asyncio.gather(*location_tasks)
-        for i, org_detail in enumerate(location_results):
-            if org_detail:
-                inventory_locations[org_ids[i]] = org_detail
-    
-    enriched_sites = []
-    for site in sites:
-        enriched_site = site.copy()
-        bu_id = site.get('ProcurementBUId')
-        
-        if bu_id and bu_id in inventory_orgs:
-            enriched_site['inventory_organizations'] = inventory_orgs[bu_id]
-            enriched_site['inventory_locations'] = inventory_locations
-        
-        enriched_sites.append(enriched_site)
-    
-    return enriched_sites
-
-async def get_item_suppliers(item: dict) -> list:
+    has_inventory_flag = False
+    for item_supplier in suppliers:
+        for site in item_supplier.sites:
+            business_unit = graph.business_unit(site.procurement_bu_id)
+            inv_org = business_unit.orgs_by_id.get(org_key) if business_unit else None
+            if inv_org is not None:
+                if inv_org.inventory_flag:
+                    has_inventory_flag = True
+                if inv_org.organization_name:
+                    return has_inventory_flag, inv_org.organization_name
+    return has_inventory_flag, None
+
+async def get_item_suppliers(item: dict, graph: EntityGraph, max_suppliers: int = DEFAULT_MAX_SUPPLIERS, max_sites: int = DEFAULT_MAX_SITES, failures: list = None) -> list:
     """Get suppliers for a specific item using the self link, including BU information.
     Filters sites to only show those belonging to business units the user has access to.
     
+    Enrichment is demand-driven: supplier associations are resolved in order until
+    max_suppliers of them have sites in the user's business units and the sites
+    resolved so far decide whether the item's organization is listed (see
+    find_item_organization). Only the sites matching the association's address, or
+    the first LOOKUP_SITES_PER_SUPPLIER (at least max_sites) others, are kept, and
+    only their business units have their inventory organizations loaded.
+    
     Args:
         item: The item dictionary containing links
+        graph: The search's entity graph, which receives the suppliers, sites and business units
+        max_suppliers: Suppliers that will be shown
+        max_sites: Sites per supplier that will be shown
+        failures: Optional list that receives a message for every lookup that failed, leaving the
+            suppliers incomplete (Fusion errors, open circuit breakers)
         
     Returns:
-        List of supplier information with BU details or empty list if none found.
+        List of ItemSupplier entities, also recorded in the graph, or empty list if none found.
     """
+    if failures is None:
+        failures = []
+    item_label = f"item {item.get('ItemNumber')} in organization {item.get('OrganizationId')}"
     
     links = item.get("links", [])
     self_link = None
@@ -231,179 +594,338 @@ async def get_item_suppliers(item: dict) -> list:
     if supplier_endpoint.startswith(FUSION_API_BASE):
         supplier_endpoint = supplier_endpoint[len(FUSION_API_BASE):]
     
-    supplier_data = await make_fusion_request(supplier_endpoint)
+    supplier_data = await make_fusion_request(fusion_query(supplier_endpoint, only_data=True))
     
+    if supplier_data and "error" in supplier_data:
+        failures.append(f"Suppliers of {item_label}: {supplier_data.get('error')}")
     if not supplier_data or "items" not in supplier_data:
         return []
     
     
-    import asyncio
-    
     async def process_supplier(supplier):
-        supplier_with_sites = supplier.copy()
-        supplier_with_sites['sites'] = []
-        
         supplier_party_id = supplier.get('SupplierId')  # Note: Field named 'SupplierId' but contains SupplierPartyId value
         
         if supplier_party_id:
-            # Oracle supplier flow: SupplierPartyId (public ID) → search → SupplierId (internal ID for child endpoints)
-            query = f"SupplierPartyId = '{supplier_party_id}'"
-            search_endpoint = f"{SUPPLIERS_ENDPOINT}?q={query}"
-            search_data = await make_fusion_request(search_endpoint)
+            supplier_ids = await resolve_supplier_ids(supplier_party_id)
+            if supplier_ids is None:
+                failures.append(f"Supplier {supplier_party_id} of {item_label}: lookup failed")
             
-            if search_data and search_data.get('items'):
-                supplier_details = search_data['items'][0]
-                actual_supplier_id = supplier_details.get('SupplierId')  # Now this is the real SupplierId
-                supplier_with_sites['SupplierPartyId'] = supplier_details.get('SupplierPartyId')
+            if supplier_ids:
+                actual_supplier_id = supplier_ids.get('SupplierId')  # Now this is the real SupplierId
                 if actual_supplier_id:
                     
-                    sites_endpoint = f"{SUPPLIERS_ENDPOINT}/{actual_supplier_id}/child/sites"
-                    sites_data = await make_fusion_request(sites_endpoint)
+                    # The same supplier usually backs many items of one search, so its sites are fetched once per request
+                    all_sites = await load("supplier_sites", actual_supplier_id, lambda supplier_ids: fetch_each(
+                        supplier_ids, lambda site_supplier_id: fetch_supplier_sites(site_supplier_id, user_business_units)
+                    ))
+                    if all_sites is None:
+                        failures.append(f"Sites of supplier {actual_supplier_id}: lookup failed")
                     
-                    if sites_data and sites_data.get("items"):
-                        
-                        all_sites = sites_data["items"]
+                    if all_sites:
                         
-                        
-                        filtered_sites = [site for site in all_sites 
-                                        if str(site.get('ProcurementBUId')) in user_business_units]
+                        filtered_sites = [site for site in graph.add_supplier_sites(actual_supplier_id, all_sites)
+                                        if str(site.procurement_bu_id) in user_business_units]
                         
                         if filtered_sites:
-                            enriched_sites = await enrich_sites_with_inventory_info(filtered_sites)
-                            
+                            # Prefer the sites matching the association's address; the formatter shows the first max_sites
                             address_name = supplier.get('AddressName')
+                            matching_sites = []
                             if address_name:
-                                matching_sites = [site for site in enriched_sites 
-                                                if site.get('SupplierSite') == address_name]
-                                if matching_sites:
-                                    supplier_with_sites['sites'] = matching_sites
-                                else:
-                                    
-                                    supplier_with_sites['sites'] = enriched_sites[:3]
-                            else:
-                                
-                                supplier_with_sites['sites'] = enriched_sites[:3]
+                                matching_sites = [site for site in filtered_sites 
+                                                if site.supplier_site == address_name]
+                            selected_sites = tuple(matching_sites or filtered_sites[:max(LOOKUP_SITES_PER_SUPPLIER, max_sites)])
+                            for bu_id in await load_site_business_units(selected_sites, graph):
+                                failures.append(f"Inventory organizations of business unit {bu_id}: lookup failed")
+                            return ItemSupplier(
+                                graph.add_supplier(actual_supplier_id, supplier_ids.get('SupplierPartyId'), supplier.get('SupplierName')),
+                                selected_sites
+                            )
         
-        return supplier_with_sites if supplier_with_sites.get('sites') else None
-    
-    supplier_tasks = [process_supplier(supplier) for supplier in supplier_data["items"]]
-    processed_suppliers = await asyncio.gather(*supplier_tasks)
+        return None
     
-    enriched_suppliers = [supplier for supplier in processed_suppliers if supplier is not None]
+    # Resolve associations in order, a batch at a time, until enough suppliers with sites are found and
+    # the organization is decided; a supplier without sites in the user's business units makes room for the next one
+    org_key = str(item.get('OrganizationId'))
+    associations = supplier_data["items"]
+    enriched_suppliers = []
+    next_index = 0
+    while next_index < len(associations):
+        missing_suppliers = max_suppliers - len(enriched_suppliers)
+        if missing_suppliers <= 0:
+            if find_item_organization(org_key, enriched_suppliers, graph)[1] is not None:
+                break
+            missing_suppliers = max_suppliers
+        batch = associations[next_index:next_index + missing_suppliers]
+        next_index += len(batch)
+        processed_suppliers = await asyncio.gather(*[process_supplier(supplier) for supplier in batch])
+        enriched_suppliers.extend(supplier for supplier in processed_suppliers if supplier is not None)
     
+    graph.set_item_suppliers(graph.add_item(item), enriched_suppliers)
     return enriched_suppliers
 
-async def find_matching_listings(product_query_terms, limit: int = 10) -> str:
-    """Find matching product listings in Oracle Fusion based on search terms.
+async def stream_matching_listings(product_query_terms, limit: int = 10, max_suppliers: int = DEFAULT_MAX_SUPPLIERS, max_sites: int = DEFAULT_MAX_SITES):
+    """Search for product listings, yielding each product as soon as it is ready.
+    
+    The stages run as a pipeline: every item goes into supplier enrichment as soon
+    as its search page arrives, and every product group is formatted as soon as its
+    items are known and their suppliers have resolved. An item number's group is
+    complete once it appears in a search page that was not truncated by the limit,
+    or once the search has finished.
     
     Args:
-        product_query_terms: Either a single search term (str) or list of search terms to match against ItemNumber and ItemDescription
-        limit: Maximum number of items to return (default: 10)
+        product_query_terms: Either a single search term (str) or list of search terms to match against ItemNumber
+        limit: Maximum number of unique item/organization pairs to return across all search terms (default: 10)
+        max_suppliers: Suppliers to resolve and show per item organization (default: 2)
+        max_sites: Sites to resolve and show per supplier (default: 2)
         
-    Returns:
-        A formatted string with the matching product listings and suppliers.
+    Yields:
+        {"type": "product", "index": ..., "product": ...} for each product in completion order,
+        where index is its position in the merged search order, then one
+        {"type": "summary", ...} record with errors, failed enrichment lookups and timings.
     """
+    started = time.monotonic()
     
     # Convert single string to list for uniform processing
     if isinstance(product_query_terms, str):
         search_terms = [product_query_terms]
     else:
         search_terms = product_query_terms
-    
-    # Oracle Fusion OR doesn't work properly, so make multiple parallel requests
-    import asyncio
-    
-    # Create individual queries for each term with case variations
-    query_tasks = []
-    for term in search_terms:
-        # Get unique case variations
-        variations = [term, term.lower(), term.upper()]
-        unique_variations = list(dict.fromkeys(variations))
-        
-        for variation in unique_variations:
-            query_param = f"ItemNumber LIKE '{variation}%'"
-            endpoint = f"{ITEMS_ENDPOINT}?q={query_param}&limit={limit}"
-            query_tasks.append(make_fusion_request(endpoint))
-    
-    # Execute all queries in parallel
-    results = await asyncio.gather(*query_tasks)
-    
-    # Check for errors in results and collect error details
-    errors = []
-    for idx, data in enumerate(results):
-        if data and "error" in data:
-            errors.append(f"Query {idx}: {data.get('error')}")
-    
-    if errors:
-        error_detail = "; ".join(errors)
-        search_terms_str = ", ".join(search_terms) if len(search_terms) > 1 else search_terms[0]
-        return {
-            "error": f"Failed to fetch products for '{search_terms_str}'",
-            "details": error_detail,
-            "auth_configured": bool(FUSION_AUTH_READ),
-            "user_id_configured": bool(FUSION_USER_ID)
-        }
-    
-    # Combine all items and remove duplicates (by ItemId + OrganizationId combination)
-    all_items = []
-    seen_combinations = set()
-    
-    for data in results:
-        if data and data.get("items"):
-            for item in data["items"]:
-                item_id = item.get("ItemId")
-                org_id = item.get("OrganizationId")
-                combination_key = f"{item_id}_{org_id}"
+    search_terms_str = ", ".join(search_terms)
+    
+    # Oracle Fusion OR doesn't work properly, so make multiple parallel requests.
+    # The planner drops case variants and terms already covered by a shorter prefix.
+    plan = plan_item_queries(search_terms)
+    
+    def search_items(prefix: str):
+        # Items keep their links, the self link is needed to look up their suppliers
+        endpoint = fusion_query(ITEMS_ENDPOINT, q=[like_prefix("ItemNumber", prefix)], limit=limit)
+        return make_fusion_request(endpoint)
+    
+    query_tasks = {}
+    supplier_tasks = {}
+    group_tasks = []
+    events = asyncio.Queue()
+    # Items, suppliers, sites and business unit organizations of this search, each held once
+    graph = EntityGraph()
+    # Supplier, site and business unit lookups that failed, leaving some products incomplete
+    enrichment_failures = []
+    
+    async def enrich_group(index: int, item_number: str, item_list: list):
+        await asyncio.gather(*[supplier_tasks[item.key] for item in item_list])
+        
+        group_data = format_grouped_item_summary(item_number, item_list, graph, max_suppliers, max_sites)
+        if group_data:
+            await events.put({"type": "product", "index": index, "product": group_data})
+    
+    # Every lookup made for this search shares one set of request-scoped loaders
+    @request_scoped
+    async def run_pipeline():
+        # Start all planned queries in parallel, then merge them in plan order until
+        # limit unique items are collected; queries still running after that are cancelled
+        for prefix in plan.queries:
+            query_tasks[prefix] = asyncio.ensure_future(search_items(prefix))
+        results = []
+        errors = []
+        item_count = 0
+        groups = {}
+        group_order = {}
+        sealed = set()
+        
+        def seal(item_number: str):
+            if item_number not in sealed:
+                sealed.add(item_number)
+                group_tasks.append(asyncio.ensure_future(enrich_group(group_order[item_number], item_number, groups[item_number])))
+        
+        try:
+            for prefix in plan.prefixes:
+                if item_count >= limit:
+                    break
                 
-                if combination_key not in seen_combinations:
-                    all_items.append(item)
-                    seen_combinations.add(combination_key)
-    
-    # Create a mock data structure like the original API response
-    data = {"items": all_items} if all_items else None
-    
-    if not data:
-        search_terms_str = ", ".join(search_terms) if len(search_terms) > 1 else search_terms[0]
-        return {
-            "error": f"No results found for query: {search_terms_str}",
+                if prefix in query_tasks:
+                    data = await query_tasks[prefix]
+                else:
+                    cover = plan.covered_by[prefix]
+                    cover_data = await query_tasks[cover]
+                    if is_truncated(cover_data, limit):
+                        # The covering query hit the limit and may have cut off this prefix's matches,
+                        # so query every prefix it covers directly
+                        followups = [p for p in plan.prefixes if plan.covered_by[p] == cover and p not in query_tasks]
+                        record_followup_queries(len(followups))
+                        for followup in followups:
+                            query_tasks[followup] = asyncio.ensure_future(search_items(followup))
+                        data = await query_tasks[prefix]
+                    else:
+                        # Filter the covering results back to what this prefix's own query would have returned
+                        data = items_with_prefix(cover_data, prefix, limit)
+                
+                results.append(data)
+                if data and "error" in data:
+                    errors.append(f"Query {len(results) - 1}: {data.get('error')}")
+                    continue
+                
+                # Combine items, remove duplicates (by ItemId + OrganizationId combination)
+                # and start each new item's supplier enrichment right away
+                page_item_numbers = []
+                for item in (data or {}).get("items") or []:
+                    combination_key = (item.get("ItemId"), item.get("OrganizationId"))
+                    if combination_key not in supplier_tasks:
+                        supplier_tasks[combination_key] = asyncio.ensure_future(get_item_suppliers(item, graph, max_suppliers, max_sites, enrichment_failures))
+                        item_number = item.get("ItemNumber")
+                        group_order.setdefault(item_number, len(group_order))
+                        groups.setdefault(item_number, []).append(graph.add_item(item))
+                        page_item_numbers.append(item_number)
+                        item_count += 1
+                        if item_count >= limit:
+                            break
+                
+                # A page that was not truncated holds every organization of the item numbers in it
+                if not is_truncated(data, limit):
+                    for item_number in dict.fromkeys(page_item_numbers):
+                        seal(item_number)
+        finally:
+            unfinished = [task for task in query_tasks.values() if not task.done()]
+            for task in unfinished:
+                task.cancel()
+            record_cancelled_queries(len(unfinished))
+        
+        for item_number in groups:
+            seal(item_number)
+        await asyncio.gather(*group_tasks)
+        
+        summary = {
+            "type": "summary",
             "total_queries": len(query_tasks),
-            "successful_queries": len([r for r in results if r and not r.get("error")])
+            "successful_queries": len([r for r in results if r and not r.get("error")]),
+            "items": item_count,
+            "errors": errors,
+            "enrichment_failures": len(enrichment_failures),
         }
+        
+        # Only give up when every variant query failed; otherwise return what the others found
+        if errors and len(errors) == len(results):
+            summary["error"] = f"Failed to fetch products for '{search_terms_str}'"
+            summary["details"] = "; ".join(errors)
+            summary["auth_configured"] = bool(FUSION_AUTH_READ)
+            summary["user_id_configured"] = bool(FUSION_USER_ID)
+        elif not groups:
+            summary["error"] = f"No results found for query: {search_terms_str}"
+        await events.put(summary)
+    
+    pipeline = asyncio.ensure_future(run_pipeline())
+    first_result_at = None
+    next_event = None
+    try:
+        while True:
+            next_event = asyncio.ensure_future(events.get())
+            await asyncio.wait({next_event, pipeline}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_event.done():
+                next_event.cancel()
+                # The pipeline failed before producing its summary
+                pipeline.result()
+            
+            event = next_event.result()
+            if event["type"] == "product":
+                if first_result_at is None:
+                    first_result_at = time.monotonic()
+                yield event
+                continue
+            
+            event["time_to_first_result_ms"] = round((first_result_at - started) * 1000, 1) if first_result_at else None
+            event["total_ms"] = round((time.monotonic() - started) * 1000, 1)
+            yield event
+            return
+    finally:
+        # Stop all outstanding work if the consumer goes away early
+        for task in [pipeline, next_event, *query_tasks.values(), *supplier_tasks.values(), *group_tasks]:
+            if task is not None and not task.done():
+                task.cancel()
+
+async def listing_results_key(product_query_terms, limit: int, max_suppliers: int, max_sites: int) -> tuple:
+    """Build the result cache key of a search.
+    
+    Terms are reduced to the sorted case variants they search for, so reordered
+    or recased terms share an entry; a reordered search is answered in the order
+    of the search that filled the entry. The user's business units are part of
+    the key, since they decide which suppliers and sites are shown.
+    """
+    user_business_units = await get_user_business_units()
+    return (canonical_terms(product_query_terms), limit, max_suppliers, max_sites, tuple(sorted(user_business_units)))
+
+def purge_listing_results(product_query_terms=None) -> int:
+    """Drop cached search results, either all of them or those of searches including any of the given terms.
     
+    Returns:
+        Number of cached results dropped.
+    """
+    if product_query_terms is None:
+        return listing_results_cache.invalidate_where(lambda key: True)
     
-    items = data.get("items", [])
-    if not items:
-        search_terms_str = ", ".join(search_terms) if len(search_terms) > 1 else search_terms[0]
-        return f"No products found matching: {search_terms_str}"
+    purged_terms = set(canonical_terms(product_query_terms))
+    return listing_results_cache.invalidate_where(lambda key: not purged_terms.isdisjoint(key[0]))
+
+async def find_matching_listings(product_query_terms, limit: int = 10, max_suppliers: int = DEFAULT_MAX_SUPPLIERS, max_sites: int = DEFAULT_MAX_SITES) -> str:
+    """Find matching product listings in Oracle Fusion based on search terms.
     
+    Complete results are cached for LISTINGS_CACHE_TTL seconds, keyed by
+    listing_results_key. Results with errors, with failed supplier, site or
+    business unit lookups, or cut short by the request deadline, are not cached.
     
-    from collections import defaultdict
-    grouped_items = defaultdict(list)
+    Args:
+        product_query_terms: Either a single search term (str) or list of search terms to match against ItemNumber and ItemDescription
+        limit: Maximum number of unique item/organization pairs to return across all search terms (default: 10)
+        max_suppliers: Suppliers to resolve and show per item organization (default: 2)
+        max_sites: Sites to resolve and show per supplier (default: 2)
+        
+    Returns:
+        A formatted string with the matching product listings and suppliers.
+    """
     
-    for item in items:
-        item_number = item.get('ItemNumber')
-        grouped_items[item_number].append(item)
+    cache_key = None
+    if LISTINGS_CACHE_TTL > 0:
+        cache_key = await listing_results_key(product_query_terms, limit, max_suppliers, max_sites)
+        cached = listing_results_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+    
+    products = []
+    async for event in stream_matching_listings(product_query_terms, limit, max_suppliers, max_sites):
+        if event["type"] == "product":
+            products.append((event["index"], event["product"]))
+        else:
+            summary = event
     
-    import asyncio
-    supplier_tasks = [get_item_suppliers(item) for item in items]
-    suppliers_results = await asyncio.gather(*supplier_tasks)
+    if "details" in summary:
+        return {
+            "error": summary["error"],
+            "details": summary["details"],
+            "auth_configured": summary["auth_configured"],
+            "user_id_configured": summary["user_id_configured"]
+        }
     
-    item_suppliers_map = {}
-    for item, suppliers in zip(items, suppliers_results):
-        item_key = f"{item.get('ItemNumber')}_{item.get('OrganizationId')}"
-        item_suppliers_map[item_key] = suppliers
+    if "error" in summary:
+        return {
+            "error": summary["error"],
+            "total_queries": summary["total_queries"],
+            "successful_queries": summary["successful_queries"]
+        }
     
-    results = []
-    for item_number, item_list in grouped_items.items():
-        group_data = format_grouped_item_summary(item_number, item_list, item_suppliers_map)
-        if group_data:
-            results.append(group_data)
+    # Products finish in any order, report them in search order
+    results = [product for _, product in sorted(products, key=lambda entry: entry[0])]
     
     if not results:
         return {"error": "No products found with valid inventory organizations for procurement.", "products": []}
     
-    return {"products": results}
+    if summary["errors"]:
+        return {"products": results, "errors": summary["errors"]}
+    
+    result = {"products": results}
+    deadline = current_deadline()
+    if cache_key is not None and not summary["enrichment_failures"] and not (deadline and deadline.exceeded):
+        listing_results_cache.set(cache_key, result)
+        return dict(result)
+    return result
 
+@request_scoped
 async def retrieve_supplier_detail(supplier_id: str, bu_id: str = None) -> str:
     """Retrieve detailed information for a specific supplier including addresses, contacts, and sites.
     
@@ -415,102 +937,71 @@ async def retrieve_supplier_detail(supplier_id: str, bu_id: str = None) -> str:
         A formatted string with comprehensive supplier information.
     """
     
-    query = f"SupplierPartyId = '{supplier_id}'"
-    search_endpoint = f"{SUPPLIERS_ENDPOINT}?q={query}"
-    search_data = await make_fusion_request(search_endpoint)
+    supplier_ids = await resolve_supplier_ids(supplier_id)
     
-    if not search_data or not search_data.get('items'):
+    if not supplier_ids:
         return f"Unable to find supplier with SupplierPartyId: {supplier_id}"
     
     
-    actual_supplier_id = search_data['items'][0].get('SupplierId')
-    
+    actual_supplier_id = supplier_ids.get('SupplierId')
     
-    endpoint = f"{SUPPLIERS_ENDPOINT}/{actual_supplier_id}"
-    supplier_data = await make_fusion_request(endpoint)
-    
-    if not supplier_data:
-        return f"Unable to fetch details for supplier ID: {supplier_id}"
-    
-    
-    addresses_endpoint = f"{SUPPLIERS_ENDPOINT}/{actual_supplier_id}/child/addresses"
-    contacts_endpoint = f"{SUPPLIERS_ENDPOINT}/{actual_supplier_id}/child/contacts"  
-    sites_endpoint = f"{SUPPLIERS_ENDPOINT}/{actual_supplier_id}/child/sites"
     
+    # Page sizes match what format_supplier_detail renders
+    endpoint = fusion_query(f"{SUPPLIERS_ENDPOINT}/{actual_supplier_id}", only_data=True)
+    addresses_endpoint = fusion_query(f"{SUPPLIERS_ENDPOINT}/{actual_supplier_id}/child/addresses", limit=DETAIL_MAX_ADDRESSES, only_data=True)
+    contacts_endpoint = fusion_query(f"{SUPPLIERS_ENDPOINT}/{actual_supplier_id}/child/contacts", only_data=True)
+    sites_endpoint = fusion_query(
+        f"{SUPPLIERS_ENDPOINT}/{actual_supplier_id}/child/sites",
+        filters=[eq("ProcurementBUId", bu_id)] if bu_id else None,
+        limit=DETAIL_MAX_SITES,
+        only_data=True
+    )
     
-    import asyncio
     
     
+    # The supplier header and its child resources only depend on the SupplierId, so fetch them together
+    supplier_task = make_fusion_request(endpoint)
     addresses_task = make_fusion_request(addresses_endpoint)
     contacts_task = make_fusion_request(contacts_endpoint)
     sites_task = make_fusion_request(sites_endpoint)
     
-    addresses_data, contacts_data, sites_data = await asyncio.gather(
-        addresses_task, contacts_task, sites_task
+    supplier_data, addresses_data, contacts_data, sites_data = await asyncio.gather(
+        supplier_task, addresses_task, contacts_task, sites_task
     )
     
+    if not supplier_data:
+        return f"Unable to fetch details for supplier ID: {supplier_id}"
+    
     
     sites_list = sites_data.get("items", []) if sites_data else []
     if bu_id and sites_list:
         sites_list = [site for site in sites_list if str(site.get('ProcurementBUId')) == str(bu_id)]
+    sites_list = sites_list[:DETAIL_MAX_SITES]
     
     
-    inventory_orgs = {}
+    business_units = {}
     if sites_list:
         unique_bu_ids = set()
         for site in sites_list:
             if site.get('ProcurementBUId'):
                 unique_bu_ids.add(site['ProcurementBUId'])
         
-        
-        inv_tasks = []
-        bu_id_list = list(unique_bu_ids)
-        for bu_id in bu_id_list:
-            inv_endpoint = f"{INVENTORY_ORGS_ENDPOINT}?q=ManagementBusinessUnitId={bu_id}"
-            inv_tasks.append(make_fusion_request(inv_endpoint))
-        
-        
-        if inv_tasks:
-            inv_results = await asyncio.gather(*inv_tasks)
-            for i, inv_data in enumerate(inv_results):
-                if inv_data and inv_data.get("items"):
-                    inventory_orgs[bu_id_list[i]] = inv_data["items"]
-    
-    
-    inventory_locations = {}
-    if inventory_orgs:
-        location_tasks = []
-        org_ids = []
-        
-        for bu_id, orgs in inventory_orgs.items():
-            for org in orgs:
-                if org.get('InventoryFlag'):  
-                    org_id = org.get('OrganizationId')
-                    if org_id:
-                        
-                        detail_endpoint = f"{INVENTORY_ORGS_ENDPOINT}/{org_id}"
-                        location_tasks.append(make_fusion_request(detail_endpoint))
-                        org_ids.append(org_id)
-        
-        
-        if location_tasks:
-            location_results = await asyncio.gather(*location_tasks)
-            for i, org_detail in enumerate(location_results):
-                if org_detail:
-                    inventory_locations[org_ids[i]] = org_detail
+        business_units = await get_business_unit_delivery_locations(unique_bu_ids)
     
     return format_supplier_detail(
         supplier_data, 
         addresses_data.get("items", []) if addresses_data else [],
         contacts_data.get("items", []) if contacts_data else [],
         sites_list,
-        inventory_orgs,
-        bu_id,
-        inventory_locations
+        business_units,
+        bu_id
     )
 
-def format_supplier_detail(supplier: dict, addresses: list = None, contacts: list = None, sites: list = None, inventory_orgs: dict = None, filter_bu_id: str = None, inventory_locations: dict = None) -> str:
-    """Format supplier details with addresses, contacts, sites, inventory organizations and locations into a readable summary."""
+def format_supplier_detail(supplier: dict, addresses: list = None, contacts: list = None, sites: list = None, business_units: dict = None, filter_bu_id: str = None) -> str:
+    """Format supplier details with addresses, contacts, sites, inventory organizations and locations into a readable summary.
+    
+    business_units maps each site's ProcurementBUId to its BusinessUnitOrgs.
+    """
     
     fields = {
         "Supplier Party ID": supplier.get('SupplierPartyId', 'N/A'),
@@ -533,7 +1024,7 @@ def format_supplier_detail(supplier: dict, addresses: list = None, contacts: lis
     
     if addresses:
         formatted_lines.append("\nAddresses:")
-        for addr in addresses[:35]:
+        for addr in addresses[:DETAIL_MAX_ADDRESSES]:
             address_info = []
             if addr.get('AddressLine1'): address_info.append(addr.get('AddressLine1'))
             if addr.get('City'): address_info.append(addr.get('City'))
@@ -567,7 +1058,7 @@ def format_supplier_detail(supplier: dict, addresses: list = None, contacts: lis
     
     if sites:
         formatted_lines.append("\nSites:")
-        for site in sites[:5]:
+        for site in sites[:DETAIL_MAX_SITES]:
             site_name = site.get('SupplierSite', 'N/A')
             bu_name = site.get('ProcurementBU', 'N/A')
             bu_id = site.get('ProcurementBUId', 'N/A')
@@ -586,23 +1077,15 @@ def format_supplier_detail(supplier: dict, addresses: list = None, contacts: lis
             formatted_lines.append(site_line)
             
             
-            if inventory_orgs and bu_id in inventory_orgs:
+            if business_units and bu_id in business_units:
                 formatted_lines.append("    Destination Organizations (Available Inventory Orgs):")
-                for org in inventory_orgs[bu_id]:
-                    if org.get('InventoryFlag'):
-                        org_id = org.get('OrganizationId', 'N/A')
-                        org_name = org.get('OrganizationName', 'N/A')
-                        org_code = org.get('OrganizationCode', 'N/A')
-                        formatted_lines.append(f"      - Organization: {org_name}\n        ID: {org_id}\n        Code: {org_code}")
+                for org in business_units[bu_id].orgs:
+                    if org.inventory_flag:
+                        formatted_lines.append(f"      - Organization: {org.organization_name}\n        ID: {org.organization_id}\n        Code: {org.organization_code}")
                         
                         
-                        if inventory_locations and org_id in inventory_locations:
-                            org_details = inventory_locations[org_id]
-                            location_id = org_details.get('LocationId', 'N/A')
-                            if location_id != 'N/A':
-                                formatted_lines.append(f"        Deliver To Location ID: {location_id}")
-                            else:
-                                formatted_lines.append("        Deliver To Location ID: Not available")
+                        if org.organization_id and org.location_id is not None:
+                            formatted_lines.append(f"        Deliver To Location ID: {org.location_id}")
                         else:
                             formatted_lines.append("        Deliver To Location ID: Not available")
     else:
@@ -610,130 +1093,91 @@ def format_supplier_detail(supplier: dict, addresses: list = None, contacts: lis
     
     return "\n".join(formatted_lines)
 
-def format_grouped_item_summary(item_number: str, item_list: list, item_suppliers_map: dict) -> dict:
-    """Format a grouped item summary as dictionary for JSON output."""
+def format_grouped_item_summary(item_number: str, item_list: list, graph: EntityGraph, max_suppliers: int = DEFAULT_MAX_SUPPLIERS, max_sites: int = DEFAULT_MAX_SITES) -> dict:
+    """Format a grouped item summary as dictionary for JSON output.
+    
+    Args:
+        item_number: The item number the group is for
+        item_list: Item entities of the group, one per organization
+        graph: The search's entity graph, holding each item's suppliers and each site's business unit
+        max_suppliers: Suppliers to show per organization
+        max_sites: Sites to show per supplier
+    """
     if not item_list:
         return {"item_name": item_number, "error": "No data available"}
     first_item = item_list[0]
     product_data = {
         "item_name": item_number,
-        "item_id": first_item.get('ItemId'),
-        "description": first_item.get('ItemDescription'),
-        "primary_uom": first_item.get('PrimaryUOMValue'),
-        "item_class": first_item.get('ItemClass'),
-        "status": first_item.get('ItemStatusValue'),
-        "purchasable": first_item.get('PurchasableFlag'),
+        "item_id": first_item.item_id,
+        "description": first_item.description,
+        "primary_uom": first_item.primary_uom,
+        "item_class": first_item.item_class,
+        "status": first_item.status,
+        "purchasable": first_item.purchasable,
         "organizations": []
     }
     
     # Process each organization - only show inventory organizations (InventoryFlag: True)
     for item in item_list:
-        org_id = item.get('OrganizationId')
-        org_code = item.get('OrganizationCode')
-        list_price = item.get('ListPrice')
-        
-        item_key = f"{item_number}_{org_id}"
-        suppliers = item_suppliers_map.get(item_key, [])
-        
-        # Check if organization has inventory flag
-        has_inventory_flag = False
-        org_name = None
-        for supplier in suppliers:
-            sites = supplier.get('sites', [])
-            for site in sites:
-                inventory_orgs = site.get('inventory_organizations', [])
-                for inv_org in inventory_orgs:
-                    if str(inv_org.get('OrganizationId')) == str(org_id):
-                        if inv_org.get('InventoryFlag'):
-                            has_inventory_flag = True
-                        org_name = inv_org.get('OrganizationName')
-                        break
-                if org_name:
-                    break
-            if org_name:
-                break
+        org_id = item.organization_id
+        org_key = str(org_id)
+        suppliers = graph.suppliers_of(item)
         
+        # Check if organization has inventory flag; the first site whose business unit knows it by name decides
+        has_inventory_flag, org_name = find_item_organization(org_key, suppliers, graph)
         if not has_inventory_flag:
             continue
         
-        # Get procurement BU info
         procurement_bu_id = None
         procurement_bu_name = None
-        for supplier in suppliers:
-            sites = supplier.get('sites', [])
-            for site in sites:
-                if site.get('ProcurementBUId'):
-                    procurement_bu_id = site.get('ProcurementBUId')
-                    procurement_bu_name = site.get('ProcurementBU')
+        for item_supplier in suppliers:
+            for site in item_supplier.sites:
+                if site.procurement_bu_id:
+                    procurement_bu_id = site.procurement_bu_id
+                    procurement_bu_name = site.procurement_bu
                     break
             if procurement_bu_id:
                 break
         
         # Process suppliers
         supplier_list = []
-        for supplier in suppliers[:2]:  # Limit to first 2 suppliers
+        for item_supplier in suppliers[:max_suppliers]:
             supplier_data = {
-                "supplier_name": supplier.get('SupplierName'),
-                "supplier_party_id": supplier.get('SupplierPartyId'),
+                "supplier_name": item_supplier.supplier.supplier_name,
+                "supplier_party_id": item_supplier.supplier.supplier_party_id,
                 "sites": []
             }
             
-            sites = supplier.get('sites', [])
-            for site in sites[:2]:  # Limit to first 2 sites
+            for site in item_supplier.sites[:max_sites]:
                 site_data = {
-                    "site_name": site.get('SupplierSite'),
-                    "business_unit": site.get('ProcurementBU'),
+                    "site_name": site.supplier_site,
+                    "business_unit": site.procurement_bu,
                     "site_purpose": []
                 }
                 
-                if site.get('SitePurposePurchasingFlag'):
+                if site.purchasing:
                     site_data["site_purpose"].append('Purchasing')
-                if site.get('SitePurposePayFlag'):
+                if site.pay:
                     site_data["site_purpose"].append('Payment')
                 
-                # Get delivery locations
-                delivery_locations = []
-                inventory_orgs = site.get('inventory_organizations', [])
-                inventory_locations = site.get('inventory_locations', {})
-                
-                for inv_org in inventory_orgs:
-                    if inv_org.get('InventoryFlag') and str(inv_org.get('OrganizationId')) == str(org_id):
-                        org_id_inv = inv_org.get('OrganizationId')
-                        if inventory_locations and org_id_inv in inventory_locations:
-                            org_details = inventory_locations[org_id_inv]
-                            location_id = org_details.get('LocationId')
-                            if location_id:
-                                delivery_locations.append({
-                                    "organization_name": inv_org.get('OrganizationName'),
-                                    "deliver_to_location_id": location_id
-                                })
-                
-                # If no delivery locations for specific org, get all inventory orgs
-                if not delivery_locations:
-                    for inv_org in inventory_orgs:
-                        if inv_org.get('InventoryFlag'):
-                            org_id_inv = inv_org.get('OrganizationId')
-                            if inventory_locations and org_id_inv in inventory_locations:
-                                org_details = inventory_locations[org_id_inv]
-                                location_id = org_details.get('LocationId')
-                                if location_id:
-                                    delivery_locations.append({
-                                        "organization_name": inv_org.get('OrganizationName'),
-                                        "deliver_to_location_id": location_id
-                                    })
-                
-                site_data["delivery_locations"] = delivery_locations[:3]  # Limit to 3
+                # Delivery locations of this organization, falling back to all inventory orgs of the site's BU
+                business_unit = graph.business_unit(site.procurement_bu_id)
+                deliveries = business_unit.deliveries_for(org_key)[:3] if business_unit else ()  # Limit to 3
+                site_data["delivery_locations"] = [
+                    {"organization_name": org.organization_name, "deliver_to_location_id": org.location_id}
+                    for org in deliveries
+                ]
                 supplier_data["sites"].append(site_data)
             
             supplier_list.append(supplier_data)
         
         org_data = {
-            "organization_code": org_code,
+            "organization_code": item.organization_code,
             "organization_name": org_name,
             "procurement_bu_id": procurement_bu_id,
             "procurement_bu_name": procurement_bu_name,
             "destination_organization_id": org_id,
-            "list_price": list_price,
+            "list_price": item.list_price,
             "suppliers": supplier_list
         }
         
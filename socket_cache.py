@@ -0,0 +1,303 @@
+import argparse
+import errno
+import fcntl
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+from typing import Any
+
+from cache_backend import CacheBackend, registered_max_entries, worker_id
+
+# Unix socket of the cache server shared by the workers of a node ("socket" cache backend)
+CACHE_SOCKET_PATH = os.getenv("CACHE_SOCKET_PATH", "/tmp/fusion-cache.sock")
+# Let a worker host the cache server itself when none is running; set to false when the
+# server runs on its own (python socket_cache.py)
+CACHE_SOCKET_SERVE = os.getenv("CACHE_SOCKET_SERVE", "true").lower() in ("1", "true", "yes")
+# Seconds a cache call may take before it counts as a miss
+CACHE_SOCKET_TIMEOUT = float(os.getenv("CACHE_SOCKET_TIMEOUT", "0.5"))
+
+# Invalidations the server remembers for workers that have not polled yet
+INVALIDATION_LOG_SIZE = 10000
+
+class CacheStore:
+    """In-memory entries and invalidation log held by the cache server."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entries: dict[tuple[str, str], tuple[str, float, float, float]] = {}
+        self.invalidations: deque = deque(maxlen=INVALIDATION_LOG_SIZE)
+        self.seq = 0
+
+    def handle(self, request: dict) -> Any:
+        op = request["op"]
+        with self._lock:
+            if op == "get":
+                entry = self.entries.get((request["cache"], request["key"]))
+                if entry is None or entry[3] <= time.time():
+                    return None
+                return list(entry[:3])
+            if op == "set":
+                now = time.time()
+                self.entries[(request["cache"], request["key"])] = (
+                    request["value"], now, now + request["ttl"], now + request["ttl"] + request["keep_for"]
+                )
+                return True
+            if op == "invalidate":
+                cache, key = request["cache"], request.get("key")
+                if key is None:
+                    for entry_key in [entry_key for entry_key in self.entries if entry_key[0] == cache]:
+                        del self.entries[entry_key]
+                else:
+                    self.entries.pop((cache, key), None)
+                self.seq += 1
+                self.invalidations.append((self.seq, request["origin"], cache, key))
+                return self.seq
+            if op == "invalidations":
+                since = request.get("since")
+                if since is None:
+                    return [self.seq, []]
+                events = [[cache, key] for seq, origin, cache, key in self.invalidations
+                          if seq > since and origin != request["origin"]]
+                return [self.seq, events]
+            if op == "compact":
+                return self._compact(request.get("max_entries") or {})
+            if op == "stats":
+                entries = {}
+                for cache, _ in self.entries:
+                    entries[cache] = entries.get(cache, 0) + 1
+                return {"entries": entries, "invalidation_seq": self.seq, "server_pid": os.getpid()}
+        raise ValueError(f"Unknown operation '{op}'")
+
+    def _compact(self, max_entries: dict[str, int]) -> int:
+        now = time.time()
+        expired = [entry_key for entry_key, entry in self.entries.items() if entry[3] <= now]
+        for entry_key in expired:
+            del self.entries[entry_key]
+        deleted = len(expired)
+        for cache, limit in max_entries.items():
+            keys = sorted((entry_key for entry_key in self.entries if entry_key[0] == cache),
+                          key=lambda entry_key: self.entries[entry_key][1], reverse=True)
+            for entry_key in keys[limit:]:
+                del self.entries[entry_key]
+                deleted += 1
+        return deleted
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Serve newline-delimited JSON requests, one JSON response line each."""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                response = {"result": self.server.store.handle(json.loads(line))}
+            except Exception as e:
+                response = {"error": str(e)}
+            self.wfile.write(json.dumps(response, separators=(",", ":")).encode() + b"\n")
+
+class CacheServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str):
+        self.store = CacheStore()
+        super().__init__(path, _RequestHandler)
+        # Only processes of the same user may read cached data
+        os.chmod(path, 0o600)
+
+def start_server(path: str) -> CacheServer | None:
+    """Serve the cache on path from a background thread, unless another process already does.
+
+    A socket file nobody answers on is left behind by a worker that died, and is
+    replaced. The takeover runs under a lock file so two workers do not both
+    replace it.
+
+    Returns:
+        The started server, or None if another process serves path.
+    """
+    with open(path + ".lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+            return None
+        except (FileNotFoundError, ConnectionRefusedError):
+            pass
+        finally:
+            probe.close()
+
+        if os.path.exists(path):
+            os.unlink(path)
+        try:
+            server = CacheServer(path)
+        except OSError as e:
+            if e.errno == errno.EADDRINUSE:
+                return None
+            raise
+    threading.Thread(target=server.serve_forever, name="fusion-cache-server", daemon=True).start()
+    print(f"🗄️ Serving the shared cache on {path} from worker {os.getpid()}")
+    return server
+
+class SocketCacheBackend(CacheBackend):
+    """Cache backend talking to a CacheServer over a Unix socket.
+
+    Entries live in the server process and last as long as it does. When no
+    server answers, the worker starts one itself (CACHE_SOCKET_SERVE), so the
+    first worker on a node serves the others and another one takes over if it
+    exits. Each backend thread has its own connection, so concurrent reads do
+    not queue behind each other.
+    """
+
+    kind = "socket"
+
+    def __init__(self, path: str):
+        self.path = path
+        # Guards the counters, the retry window and the set of open connections
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections: set[tuple[socket.socket, Any]] = set()
+        self._retry_at = 0.0
+        self._server: CacheServer | None = None
+        self.calls = 0
+        self.read_hits = 0
+        self.reads = 0
+        self.writes = 0
+        self.errors = 0
+        self.connections = 0
+        self.compactions = 0
+        self.compacted_entries = 0
+        self._connect()
+
+    def _connect(self) -> tuple[socket.socket, Any]:
+        with self._lock:
+            if CACHE_SOCKET_SERVE:
+                self._server = start_server(self.path) or self._server
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.settimeout(CACHE_SOCKET_TIMEOUT)
+            try:
+                connection.connect(self.path)
+            except OSError:
+                connection.close()
+                raise
+            self._local.connection = (connection, connection.makefile("rb"))
+            self._connections.add(self._local.connection)
+            self.connections += 1
+        return self._local.connection
+
+    def _disconnect(self, connection: tuple[socket.socket, Any]):
+        with self._lock:
+            self._connections.discard(connection)
+        connection[1].close()
+        connection[0].close()
+        if getattr(self._local, "connection", None) is connection:
+            self._local.connection = None
+
+    def _call(self, request: dict, default: Any = None) -> Any:
+        with self._lock:
+            self.calls += 1
+        connection = getattr(self._local, "connection", None)
+        try:
+            if connection is None:
+                # Do not slow every cache call down while the server is unreachable
+                if time.monotonic() < self._retry_at:
+                    return default
+                connection = self._connect()
+            connection[0].sendall(json.dumps(request, separators=(",", ":")).encode() + b"\n")
+            line = connection[1].readline()
+            if not line:
+                raise ConnectionError("cache server closed the connection")
+            response = json.loads(line)
+        except (OSError, ValueError) as e:
+            if connection is not None:
+                self._disconnect(connection)
+            self._retry_at = time.monotonic() + 1.0
+            self._failed(request["op"], e)
+            return default
+        if "error" in response:
+            self._failed(request["op"], response["error"])
+            return default
+        return response["result"]
+
+    def get(self, cache: str, key: str) -> tuple[str, float, float] | None:
+        entry = self._call({"op": "get", "cache": cache, "key": key})
+        with self._lock:
+            self.reads += 1
+            self.read_hits += entry is not None
+        return None if entry is None else tuple(entry)
+
+    def set(self, cache: str, key: str, value: str, ttl: float, keep_for: float):
+        if self._call({"op": "set", "cache": cache, "key": key, "value": value, "ttl": ttl, "keep_for": keep_for}):
+            with self._lock:
+                self.writes += 1
+
+    def invalidate(self, cache: str, key: str = None):
+        self._call({"op": "invalidate", "cache": cache, "key": key, "origin": worker_id()})
+
+    def invalidations_since(self, seq: int | None) -> tuple[int, list[tuple[str, str | None]]]:
+        result = self._call({"op": "invalidations", "since": seq, "origin": worker_id()})
+        if result is None:
+            return seq or 0, []
+        latest, events = result
+        # A restarted server counts from zero again; start over from its position
+        if seq is not None and latest < seq:
+            return latest, []
+        return latest, [(cache, key) for cache, key in events]
+
+    def compact(self, max_entries: dict[str, int] = None) -> int:
+        """Delete expired entries on the server and trim each cache to its size bound."""
+        deleted = self._call({
+            "op": "compact",
+            "max_entries": max_entries if max_entries is not None else registered_max_entries()
+        }, default=0)
+        with self._lock:
+            self.compactions += 1
+            self.compacted_entries += deleted
+        return deleted
+
+    def _failed(self, operation: str, error):
+        # An unreachable cache server must never fail the request; it only costs upstream calls
+        with self._lock:
+            self.errors += 1
+        print(f"⚠️ Shared cache {operation} failed on {self.path}: {error}")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "path": self.path,
+            "serving": self._server is not None,
+            **(self._call({"op": "stats"}) or {}),
+            "calls": self.calls,
+            "reads": self.reads,
+            "read_hits": self.read_hits,
+            "writes": self.writes,
+            "errors": self.errors,
+            "connections": self.connections,
+            "compactions": self.compactions,
+            "compacted_entries": self.compacted_entries,
+        }
+
+    def close(self):
+        with self._lock:
+            connections = list(self._connections)
+        for connection in connections:
+            self._disconnect(connection)
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the shared cache server for the uvicorn workers of this node")
+    parser.add_argument("--socket", default=CACHE_SOCKET_PATH, help="Unix socket path")
+    args = parser.parse_args()
+
+    server = start_server(args.socket)
+    if server is None:
+        raise SystemExit(f"❌ A cache server is already running on {args.socket}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        server.server_close()